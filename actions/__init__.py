@@ -1,20 +1,8 @@
 # actions/__init__.py
 
-# from actions.career.career_advice import ActionGiveCareerAdvice
-# from actions.career.career_advice import ActionFollowupCareerAdvice
-
-# from actions.career.gemini_advice import (
-#     ActionGiveCareerAdvice,
-#     ActionFollowupCareerAdvice
-# )
-
-# from actions.career.get_user_query import ActionGetUserQuery
-
-# from actions.career.ai_adviser import ActionGiveCareerAdvice
-
-from actions.school_support.sch_check_rag_success import ActionCheckRagResult
-
-from actions.general.slots_validation import ValidateCareerAdviceForm
+# Kept import-free so the action server starts fast: the actions are registered
+# by actions/registry.py (`actions_module` in endpoints.yml), which imports
+# each action module on its first run and loads .env before the first one.
 
 # # Suppress Pydantic UserWarnings
 import warnings
@@ -25,12 +13,3 @@ warnings.filterwarnings(
     category=UserWarning, 
     module='pydantic'
 )
-
-# from actions.general.human_handoff import ActionHumanHandoff
-
-# logger setup
-from actions.general.logger_utils import get_logger
-
-# load environment variables
-from dotenv import load_dotenv
-load_dotenv()
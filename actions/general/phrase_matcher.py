@@ -0,0 +1,148 @@
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Text, Union
+
+import yaml
+
+DEFAULT_VOCABULARIES_FILE = Path(__file__).resolve().parent / "slot_vocabularies.yml"
+
+_DROP_APOSTROPHES = str.maketrans("", "", "'’ʼ`")
+# Runs of whitespace and punctuation become one space
+_NON_WORD = re.compile(r"[\W_]+")
+# The same for ASCII answers in one bytes.translate: letters lower-cased, digits kept, anything else a space
+_ASCII_WORD_BYTES = bytes(
+    b + 32 if 65 <= b <= 90 else b if chr(b).isalnum() else 32 for b in range(128)
+) + b" " * 128
+_ASCII_APOSTROPHES = b"'`"
+
+
+def normalize(text: Text) -> Text:
+    """
+    Matching form of a phrase or an answer: case-folded, accents and
+    apostrophes removed, any other punctuation read as a space
+    ("Je préfère NE PAS!" -> "je prefere ne pas", "don’t" -> "dont").
+    """
+    if text.isascii():
+        # Fast path for the common case, same result as below
+        return " ".join(text.encode().translate(_ASCII_WORD_BYTES, _ASCII_APOSTROPHES).decode().split())
+    text = text.casefold().translate(_DROP_APOSTROPHES)
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _trie_pattern(phrases: Iterable[Text]) -> Text:
+    """
+    Regex source matching any of `phrases`, factored as a character trie so
+    the regex engine never retries a shared prefix ("prefer not", "prefer not
+    to say" -> "prefer\\ not(?:\\ to\\ say)?"). Longer phrases are tried first.
+    """
+    trie: Dict[Text, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _build(node: Dict[Text, dict]) -> Text:
+        branches = [re.escape(ch) + _build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return _build(trie)
+
+
+def _load_config(path: Optional[Union[Text, Path]]) -> Dict[Text, Any]:
+    path = Path(path or os.getenv("SLOT_VOCABULARIES_FILE") or DEFAULT_VOCABULARIES_FILE)
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_vocabularies(path: Optional[Union[Text, Path]] = None) -> Dict[Text, List[Text]]:
+    """
+    Reads `{"vocabularies": {<category>: [phrases] or {<language>: [phrases]}}}`
+    from `path` (default: SLOT_VOCABULARIES_FILE or slot_vocabularies.yml).
+
+    Returns:
+        dict: The phrases of every category, all languages together.
+    """
+    config = _load_config(path)
+    vocabularies: Dict[Text, List[Text]] = {}
+    for category, phrases in (config.get("vocabularies") or {}).items():
+        if isinstance(phrases, dict):
+            phrases = [phrase for by_language in phrases.values() for phrase in by_language]
+        vocabularies[str(category)] = [str(phrase) for phrase in phrases]
+    return vocabularies
+
+
+def load_slot_categories(path: Optional[Union[Text, Path]] = None) -> Dict[Text, List[Text]]:
+    """
+    Reads `{"slots": {<slot>: [categories]}}` from the same file as
+    `load_vocabularies`: the vocabularies each slot validator acts on.
+
+    Raises:
+        ValueError: A slot names a category that has no vocabulary.
+    """
+    config = _load_config(path)
+    known = {str(category) for category in config.get("vocabularies") or {}}
+    slots = {str(slot): [str(c) for c in categories] for slot, categories in (config.get("slots") or {}).items()}
+    unknown = {c for categories in slots.values() for c in categories} - known
+    if unknown:
+        raise ValueError(f"slots use categories without a vocabulary: {sorted(unknown)}")
+    return slots
+
+
+class PhraseMatcher:
+    """
+    Finds known phrases in free-text answers with one compiled regex for all
+    vocabularies.
+
+    Phrases only match whole words of the normalized answer, and at each
+    position the longest phrase wins ("not sure" is a not_specified, not a
+    "yes" through "sure"). A call costs a few microseconds
+    whatever the vocabulary size: a bit more than scanning the shipped
+    ~85 phrases one by one, less from ~150 phrases on (see
+    tests/perf/bench_phrase_matcher.py).
+    """
+
+    def __init__(self, vocabularies: Dict[Text, Iterable[Text]]):
+        self._categories: Dict[Text, FrozenSet[Text]] = {}
+        for category, phrases in vocabularies.items():
+            for phrase in phrases:
+                key = normalize(phrase)
+                if key:
+                    self._categories[key] = self._categories.get(key, frozenset()) | {category}
+        self.vocabularies = frozenset(vocabularies)
+        # Normalized answers are matched padded with spaces: a phrase starts after one and is followed by one
+        self._pattern = re.compile(" (" + _trie_pattern(self._categories) + ")(?= )") if self._categories else None
+
+    @classmethod
+    def from_file(cls, path: Optional[Union[Text, Path]] = None) -> "PhraseMatcher":
+        """Builds a matcher from `load_vocabularies(path)`."""
+        return cls(load_vocabularies(path))
+
+    def __len__(self) -> int:
+        return len(self._categories)
+
+    def categories(self, text: Text) -> Set[Text]:
+        """Every vocabulary with a phrase in `text`."""
+        found: Set[Text] = set()
+        if self._pattern is not None:
+            for match in self._pattern.finditer(f" {normalize(text)} "):
+                found |= self._categories[match.group(1)]
+        return found
+
+    def matches(self, text: Text, *categories: Text) -> bool:
+        """Whether `text` contains a phrase of any of `categories` (stops at the first one)."""
+        if self._pattern is not None:
+            for match in self._pattern.finditer(f" {normalize(text)} "):
+                if not self._categories[match.group(1)].isdisjoint(categories):
+                    return True
+        return False
@@ -5,8 +5,15 @@ from rasa_sdk.events import SlotSet
 from rasa_sdk.types import DomainDict
 import logging
 
+from actions.general.phrase_matcher import PhraseMatcher, load_slot_categories
+
 logger = logging.getLogger(__name__)
 
+# Skip / yes / no / "not specified" vocabularies (slot_vocabularies.yml), compiled once for all validators
+PHRASES = PhraseMatcher.from_file()
+# Vocabularies each validator reads as "no answer" (`slots` in slot_vocabularies.yml)
+DECLINED = load_slot_categories()
+
 class ValidateCareerAdviceForm(ValidationAction):
     def name(self) -> Text:
         return "validate_career_advice"
@@ -22,8 +29,7 @@ class ValidateCareerAdviceForm(ValidationAction):
         
         if slot_value:
             # Check if user wants to skip
-            skip_phrases = ["skip", "prefer not", "don't want", "no thanks", "pass"]
-            if any(phrase in slot_value.lower() for phrase in skip_phrases):
+            if PHRASES.matches(slot_value, *DECLINED["student_name"]):
                 return {"student_name": "Student"}
         
         return {"student_name": slot_value}
@@ -38,8 +44,7 @@ class ValidateCareerAdviceForm(ValidationAction):
         """Allow skipping year"""
         
         if slot_value:
-            skip_phrases = ["skip", "prefer not", "don't know", "not sure"]
-            if any(phrase in slot_value.lower() for phrase in skip_phrases):
+            if PHRASES.matches(slot_value, *DECLINED["year_of_study"]):
                 return {"year_of_study": "not_specified"}
         
         return {"year_of_study": slot_value}
@@ -54,8 +59,7 @@ class ValidateCareerAdviceForm(ValidationAction):
         """Allow skipping GPA"""
         
         if slot_value:
-            skip_phrases = ["skip", "prefer not", "private", "don't want", "pass"]
-            if any(phrase in slot_value.lower() for phrase in skip_phrases):
+            if PHRASES.matches(slot_value, *DECLINED["gpa"]):
                 return {"gpa": "not_provided"}
         
         return {"gpa": slot_value}
@@ -70,11 +74,19 @@ class ValidateCareerAdviceForm(ValidationAction):
         """Allow skipping internship question"""
         
         # If they explicitly skip, set to None
-        if slot_value is None or (isinstance(slot_value, str) and 
-                                   any(phrase in slot_value.lower() 
-                                       for phrase in ["skip", "prefer not", "pass"])):
+        if slot_value is None:
             return {"has_internship": None}
         
+        # Free-text answers ("yeah, one last summer") become the bool the slot expects
+        if isinstance(slot_value, str):
+            found = PHRASES.categories(slot_value)
+            if found & set(DECLINED["has_internship"]):
+                return {"has_internship": None}
+            if "yes" in found and "no" not in found:
+                return {"has_internship": True}
+            if "no" in found and "yes" not in found:
+                return {"has_internship": False}
+        
         return {"has_internship": slot_value}
     
     def validate_visa_status(
@@ -87,8 +99,7 @@ class ValidateCareerAdviceForm(ValidationAction):
         """Allow skipping visa status"""
         
         if slot_value:
-            skip_phrases = ["skip", "prefer not", "not relevant"]
-            if any(phrase in slot_value.lower() for phrase in skip_phrases):
+            if PHRASES.matches(slot_value, *DECLINED["visa_status"]):
                 return {"visa_status": "not_specified"}
         
         return {"visa_status": slot_value}
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+from typing import Any, Dict, List, Optional, Text
+
+from rasa_sdk import Tracker
+
+# Events of the tracker an action looks at; older ones are ignored, so the cost
+# of an action does not grow with the length of the conversation
+MAX_EVENTS = int(os.getenv("ACTION_TRACKER_MAX_EVENTS", 200))
+
+
+class EventIndex:
+    """
+    Latest events of a tracker, indexed by type in a single pass over the
+    last `max_events` events, so repeated lookups within one action run are O(1).
+    """
+
+    def __init__(self, events: List[Dict[Text, Any]], max_events: int = MAX_EVENTS):
+        self.tail = events[-max_events:] if max_events > 0 else list(events)
+        self._last_by_type: Dict[Text, Dict[Text, Any]] = {}
+        self._last_by_utter_action: Dict[Text, Dict[Text, Any]] = {}
+        for event in self.tail:
+            self._last_by_type[event.get("event")] = event
+            if event.get("event") == "bot":
+                utter_action = (event.get("metadata") or {}).get("utter_action")
+                if utter_action:
+                    self._last_by_utter_action[utter_action] = event
+
+    def last(self, event_type: Text) -> Optional[Dict[Text, Any]]:
+        """Most recent event of `event_type` ("bot", "user", "action", "slot", ...)."""
+        return self._last_by_type.get(event_type)
+
+    def last_bot_event(self) -> Optional[Dict[Text, Any]]:
+        return self.last("bot")
+
+    def last_utter_action(self) -> Optional[Text]:
+        """Response name (e.g. "utter_no_relevant_answer_found") of the most recent bot message."""
+        event = self.last_bot_event()
+        return (event.get("metadata") or {}).get("utter_action") if event else None
+
+    def last_uttered(self, utter_action: Text) -> Optional[Dict[Text, Any]]:
+        """Most recent bot message produced by the response `utter_action`."""
+        return self._last_by_utter_action.get(utter_action)
+
+
+def event_index(tracker: Tracker, max_events: int = MAX_EVENTS) -> EventIndex:
+    """
+    The `EventIndex` of a tracker, built on first use and reused by every
+    later call within the same action run (the SDK builds a new Tracker per request).
+    """
+    index = getattr(tracker, "_event_index", None)
+    if index is None:
+        index = EventIndex(tracker.events, max_events)
+        tracker._event_index = index
+    return index
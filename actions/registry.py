@@ -0,0 +1,154 @@
+"""
+Lazy action registry: the action server's entry point (`actions_module` in endpoints.yml).
+
+The Rasa SDK imports the configured module and registers every Action
+subclass it can see. Instead of importing every action module (and their
+dependencies) at start-up, this module finds the actions by reading the
+source of the `actions` package, registers a lightweight proxy for each, and
+imports an action's real module the first time the action runs.
+
+    python -m actions.registry          # discovered actions and what importing each costs
+
+Set ACTIONS_LAZY=false to import every action module at start-up instead.
+"""
+
+import ast
+import importlib
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+PACKAGE = __name__.rpartition(".")[0] or "actions"
+LAZY = os.getenv("ACTIONS_LAZY", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+# Import times of the action modules loaded so far, in seconds
+import_times: Dict[Text, float] = {}
+_import_lock = threading.Lock()
+_dotenv_loaded = False
+
+
+def _literal_name(node: ast.ClassDef) -> Optional[Text]:
+    """The string a class's `name()` method returns, if it is a literal."""
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name == "name":
+            for statement in ast.walk(item):
+                if isinstance(statement, ast.Return) and isinstance(statement.value, ast.Constant) \
+                        and isinstance(statement.value.value, str):
+                    return statement.value.value
+    return None
+
+
+def discover_actions(package_dir: Path = PACKAGE_DIR, package: Text = PACKAGE) -> Dict[Text, Tuple[Text, Text]]:
+    """
+    Finds the custom actions of the package without importing it: every
+    top-level *Action subclass whose `name()` returns a string literal
+    (commented-out code is naturally skipped).
+
+    Returns:
+        dict: action name -> (module, class name)
+    """
+    found: Dict[Text, Tuple[Text, Text]] = {}
+    for path in sorted(package_dir.rglob("*.py")):
+        if path.name == "__init__.py" or path == Path(__file__).resolve():
+            continue
+        module = ".".join((package, *path.relative_to(package_dir).with_suffix("").parts))
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        for node in tree.body:
+            # Action, ValidationAction, FormValidationAction, ...
+            bases = [getattr(base, "id", getattr(base, "attr", "")) for base in getattr(node, "bases", [])]
+            if isinstance(node, ast.ClassDef) and any(base.endswith("Action") for base in bases):
+                action_name = _literal_name(node)
+                if action_name:
+                    found[action_name] = (module, node.name)
+    return found
+
+
+def _import(module: Text) -> Any:
+    global _dotenv_loaded
+    with _import_lock:
+        if module in sys.modules:
+            return sys.modules[module]
+        if not _dotenv_loaded:
+            # Action modules may read their settings at import time
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _dotenv_loaded = True
+        started = time.perf_counter()
+        loaded = importlib.import_module(module)
+        import_times[module] = time.perf_counter() - started
+        logger.info("Imported action module %s in %.0f ms", module, import_times[module] * 1000)
+        return loaded
+
+
+def _make_proxy(action_name: Text, module: Text, class_name: Text) -> type:
+    """An Action subclass that imports `module` and delegates to `class_name` on first run."""
+
+    def name(self) -> Text:
+        return action_name
+
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        if self._action is None:
+            self._action = getattr(_import(module), class_name)()
+        events = self._action.run(dispatcher, tracker, domain)
+        return await events if inspect.isawaitable(events) else events
+
+    return type(class_name, (Action,), {
+        "__module__": __name__,
+        "__doc__": f"Lazy proxy for {module}.{class_name}.",
+        "_action": None,
+        "name": name,
+        "run": run,
+    })
+
+
+def report() -> List[Dict[Text, Any]]:
+    """Every discovered action with its module and, once imported, the module's import time."""
+    return [
+        {
+            "action": action_name,
+            "module": module,
+            "class": class_name,
+            "imported": module in sys.modules,
+            "import_ms": round(import_times[module] * 1000, 1) if module in import_times else None,
+        }
+        for action_name, (module, class_name) in sorted(ACTIONS.items())
+    ]
+
+
+ACTIONS = discover_actions()
+
+if LAZY:
+    PROXIES = {action_name: _make_proxy(action_name, module, class_name)
+               for action_name, (module, class_name) in ACTIONS.items()}
+else:
+    # The real classes register themselves once imported
+    PROXIES = {}
+    for _module in sorted({module for module, _ in ACTIONS.values()}):
+        _import(_module)
+
+
+if __name__ == "__main__":
+    # Import every action module once, in a fresh process, to show its cold-start cost
+    started = time.perf_counter()
+    for module in sorted({module for module, _ in ACTIONS.values()}):
+        _import(module)
+    total_ms = (time.perf_counter() - started) * 1000
+    rows = report()
+    width = max([len("action"), *(len(row["action"]) for row in rows)])
+    print(f"{'action':<{width}}  {'import ms':>9}  module")
+    for row in rows:
+        print(f"{row['action']:<{width}}  {row['import_ms']:>9}  {row['module']}.{row['class']}")
+    print(f"\n{len(rows)} actions; importing their modules took {total_ms:.0f} ms "
+          f"(modules imported first also pay for dependencies they share with later ones)")
@@ -4,6 +4,7 @@ from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 
 from actions.general.logger_utils import get_logger
+from actions.general.tracker_utils import event_index
 
 # Initialize a logger for this global setup block
 logger = get_logger("sch_check_rag_success.py")
@@ -19,13 +20,10 @@ class ActionCheckRagResult(Action):
         domain: Dict[Text, Any],
     ) -> List[Dict[Text, Any]]:
         
-        # Get the most recent bot event
-        last_bot_event = None
-        for event in reversed(tracker.events):
-            if event.get("event") == "bot":
-                last_bot_event = event
-                logger.info("\n RAG_RESULT_CHECK: confirmed! last event was response by bot")
-                break
+        # Get the most recent bot event (indexed once over a bounded tail of the tracker)
+        last_bot_event = event_index(tracker).last_bot_event()
+        if last_bot_event:
+            logger.info("\n RAG_RESULT_CHECK: confirmed! last event was response by bot")
         
         # Check for failure indicators in the bot's response
         failure_responses = [
@@ -37,7 +35,7 @@ class ActionCheckRagResult(Action):
         
         if last_bot_event:
             # Check if it was a failure response
-            response_name = last_bot_event.get("metadata", {}).get("utter_action")
+            response_name = event_index(tracker).last_utter_action()
             if response_name in failure_responses:
                 rag_succeeded = False
                 logger.info("RAG_RESULT_CHECK: RAG was unsuccessful! \n")
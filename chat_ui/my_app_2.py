@@ -1,10 +1,37 @@
-import streamlit as st
-import requests
+import itertools
+import json
+import os
 import uuid
+from collections import deque
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RASA_ENDPOINT = os.getenv("RASA_ENDPOINT", "http://localhost:5005/webhooks/rest/webhook")
+# (connect, read) timeouts in seconds; the read timeout applies between streamed messages
+RASA_TIMEOUT = (
+    float(os.getenv("RASA_CONNECT_TIMEOUT", 3.05)),
+    float(os.getenv("RASA_READ_TIMEOUT", 60)),
+)
+# Ask Rasa's REST channel to send each bot message as soon as it is produced
+RASA_STREAM = os.getenv("RASA_STREAM", "true").lower() == "true"
+
+# Messages kept per browser session (older ones are dropped) and drawn per page
+MAX_STORED_MESSAGES = int(os.getenv("CHAT_MAX_STORED_MESSAGES", 200))
+HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", 20))
 
 # Initialize session state for conversation history and button handling
 if 'messages' not in st.session_state:
-    st.session_state.messages = []
+    # Bounded: a long advising session can't grow memory without limit
+    st.session_state.messages = deque(maxlen=MAX_STORED_MESSAGES)
+
+if 'total_messages' not in st.session_state:
+    st.session_state.total_messages = 0
+
+if 'visible_messages' not in st.session_state:
+    st.session_state.visible_messages = HISTORY_PAGE_SIZE
 
 if 'sender_id' not in st.session_state:
     st.session_state.sender_id = str(uuid.uuid4())
@@ -26,8 +53,42 @@ st.title("Golden Prime")
 # ------ Helper function that sends/receives messages ----- #
 # ----------- to/from the server's API Endpoint ----------- #
 
+@st.cache_resource
+def get_http_session():
+    """
+    One pooled, keep-alive HTTP session per Streamlit server process, shared by
+    every browser session (connection setup is not paid on every message).
+    """
+    session = requests.Session()
+    # Only retry failures to connect; a message Rasa has received must never be sent twice
+    retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3, allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 # Function to send message to Rasa server
+BAD_REPLY_TEXT = "Sorry, the assistant sent a reply I couldn't read. Please try again."
+
+
+def _as_messages(decoded):
+    """Yields the message dicts in a decoded reply; lists (nested or not) are flattened."""
+    if isinstance(decoded, dict):
+        yield decoded
+    elif isinstance(decoded, list):
+        for item in decoded:
+            yield from _as_messages(item)
+
+
 def send_message_to_rasa(message, metadata=None):
+    """
+    Sends a message to Rasa and yields the bot messages one by one.
+
+    With RASA_STREAM the REST channel answers with one JSON message per line
+    as soon as each one is produced, so the first reply can be drawn while a
+    sub-agent is still working on the rest.
+    """
     payload = {
         "sender": st.session_state.sender_id,
         "message": message
@@ -35,16 +96,63 @@ def send_message_to_rasa(message, metadata=None):
     if metadata:
         payload["metadata"] = metadata
 
-    RASA_ENDPOINT = "http://localhost:5005/webhooks/rest/webhook"
+    try:
+        with get_http_session().post(
+            RASA_ENDPOINT,
+            params={"stream": "true"} if RASA_STREAM else None,
+            json=payload,
+            timeout=RASA_TIMEOUT,
+            stream=RASA_STREAM,
+        ) as response:
+            response.raise_for_status()
+            if not RASA_STREAM:
+                try:
+                    decoded = json.loads(response.text)
+                except ValueError:
+                    yield {"text": BAD_REPLY_TEXT}
+                    return
+                yield from _as_messages(decoded)
+                return
+            bad_lines = 0
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                try:
+                    decoded = json.loads(line)
+                except ValueError:
+                    # Skip the unreadable line; the messages around it are still shown
+                    bad_lines += 1
+                    continue
+                yield from _as_messages(decoded)
+            if bad_lines:
+                yield {"text": BAD_REPLY_TEXT}
+    except requests.exceptions.RequestException as e:
+        yield {"text": f"Sorry, I couldn't reach the assistant right now ({type(e).__name__}). Please try again."}
 
-    json_payload = {
-        "sender": st.session_state.sender_id,
-        "message": message
-    }
 
-    response = requests.post(RASA_ENDPOINT, json=json_payload)
-    return response.json()
+def add_message(role, content):
+    """Appends to the bounded history (the oldest message drops out at the cap)."""
+    st.session_state.messages.append({"role": role, "content": content})
+    st.session_state.total_messages += 1
+
+
+def handle_bot_messages(bot_messages):
+    """
+    Draws each bot message the moment it arrives, adds it to the history and
+    updates the button state from the last message that carried buttons.
+    """
+    buttons = []
+    for msg in bot_messages:
+        bot_text = msg.get("text", "")
+        if bot_text:
+            with st.chat_message("assistant"):
+                st.write(bot_text)
+
+        add_message("assistant", bot_text)
+        buttons = msg.get("buttons", []) or buttons
 
+    st.session_state.current_buttons = buttons
+    st.session_state.awaiting_button_response = bool(buttons)
 
 
 # Start session on first load
@@ -56,127 +164,111 @@ if not st.session_state.session_started:
     )
     
     # Process the greeting message response
-    for msg in bot_messages:
-        bot_text = msg.get("text", "")
-        buttons = msg.get("buttons", [])
-        
-        st.session_state.messages.append({
-            "role": "assistant",
-            "content": bot_text
-        })
-        
-        if buttons:
-            st.session_state.current_buttons = buttons
-            st.session_state.awaiting_button_response = True
-    
+    handle_bot_messages(bot_messages)
+
     st.session_state.session_started = True
     st.rerun()
 
 
 # -------------------------------------------------------- #
-# ----------------- Display chat history ----------------- # 
+# ----------------- Display chat history ----------------- #
 
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.write(message["content"])
+def render_history():
+    """
+    Draws only the newest page of the history; "Load earlier messages" adds
+    one more page at a time.
+    """
+    messages = st.session_state.messages
+    visible = min(st.session_state.visible_messages, len(messages))
 
+    if visible < len(messages):
+        if st.button(f"Load earlier messages ({len(messages) - visible} more)", key="load_earlier"):
+            visible = min(visible + HISTORY_PAGE_SIZE, len(messages))
+            st.session_state.visible_messages = visible
+    elif st.session_state.total_messages > len(messages):
+        st.caption("Earlier messages are no longer kept in this session.")
 
-# ----------------------------------------------- #
-# ----------- Handle button responses ----------- #
+    for message in itertools.islice(messages, len(messages) - visible, None):
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
 
-# Show buttons if we're waiting for a button response
-if st.session_state.awaiting_button_response and st.session_state.current_buttons:
-    # st.write("**Choose an option:**")
 
-    # Create columns for buttons
-    cols = st.columns(len(st.session_state.current_buttons))
-    
-    for idx, button in enumerate(st.session_state.current_buttons):
-        with cols[idx]:
-            if st.button(button["title"], key=f"btn_{idx}"):
-                # Add user's choice to chat history (show the title, not payload)
-                st.session_state.messages.append({
-                    "role": "user",
-                    "content": button["title"]
-                })
-                
-                # Send the payload to Rasa
-                bot_messages = send_message_to_rasa(button["payload"])
+# Everything below reruns on its own when the user chats or clicks, instead of
+# the whole script (st.rerun(scope="fragment") keeps it that way)
+@st.fragment
+def chat():
+    render_history()
 
-    
-    # ---- uncomment below to use selectbox approach ---- #
-
-    # # ======== Using Selectbox to handle buttons (alternative approach) ========
-    # # Show selectbox if we have buttons
-    # selected_title = st.selectbox(
-    #     "Choose an option:",
-    #     options=[btn["title"] for btn in st.session_state.current_buttons],
-    #     key="button_select"
-    # )
-    
-    # if st.button("Send Choice", key="send_choice"):
-    #     # Find the payload for the selected title
-    #     selected_button = next(
-    #         btn for btn in st.session_state.current_buttons 
-    #         if btn["title"] == selected_title
-    #     )
-        
-    #     # Add user's choice to history
-    #     st.session_state.messages.append({
-    #         "role": "user",
-    #         "content": selected_title
-    #     })
-        
-    #     # Send payload to Rasa
-    #     bot_messages = send_message_to_rasa(selected_button["payload"])
-
-        # If using the selectbox approach, move the for-loop below
-        # to this indentation level
-
-                # Process bot responses
-                for msg in bot_messages:
-                    bot_text = msg.get("text", "")
-                    new_buttons = msg.get("buttons", [])
-                    
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": bot_text
-                    })
-                    
-                    # Update button state
-                    if new_buttons:
-                        st.session_state.current_buttons = new_buttons
-                        st.session_state.awaiting_button_response = True
-                    else:
-                        st.session_state.current_buttons = []
-                        st.session_state.awaiting_button_response = False
-                
-                st.rerun()
-
-# ----------------------------------------------- #
-
-# Regular text input (only show if not waiting for button response)
-if not st.session_state.awaiting_button_response:
-    if user_input := st.chat_input("Type your message here..."):
-        # Add user message to history
-        st.session_state.messages.append({"role": "user", "content": user_input})
-        
-        # Send to Rasa
-        bot_messages = send_message_to_rasa(user_input)
-        
-        # Process bot responses
-        for msg in bot_messages:
-            bot_text = msg.get("text", "")
-            buttons = msg.get("buttons", [])
-            
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": bot_text
-            })
-            
-            # If there are buttons, set up button state
-            if buttons:
-                st.session_state.current_buttons = buttons
-                st.session_state.awaiting_button_response = True
-        
-        st.rerun()
+    # ----------------------------------------------- #
+    # ----------- Handle button responses ----------- #
+
+    # Show buttons if we're waiting for a button response
+    if st.session_state.awaiting_button_response and st.session_state.current_buttons:
+        # st.write("**Choose an option:**")
+
+        # Create columns for buttons
+        cols = st.columns(len(st.session_state.current_buttons))
+
+        clicked = None
+        for idx, button in enumerate(st.session_state.current_buttons):
+            with cols[idx]:
+                if st.button(button["title"], key=f"btn_{idx}"):
+                    clicked = button
+
+        if clicked is not None:
+            # Add user's choice to chat history (show the title, not payload)
+            add_message("user", clicked["title"])
+            with st.chat_message("user"):
+                st.write(clicked["title"])
+
+            # Send the payload to Rasa and draw the replies as they arrive
+            handle_bot_messages(send_message_to_rasa(clicked["payload"]))
+            # The button row has to be redrawn (or removed)
+            st.rerun(scope="fragment")
+
+        # ---- uncomment below to use selectbox approach ---- #
+
+        # # ======== Using Selectbox to handle buttons (alternative approach) ========
+        # # Show selectbox if we have buttons
+        # selected_title = st.selectbox(
+        #     "Choose an option:",
+        #     options=[btn["title"] for btn in st.session_state.current_buttons],
+        #     key="button_select"
+        # )
+
+        # if st.button("Send Choice", key="send_choice"):
+        #     # Find the payload for the selected title
+        #     selected_button = next(
+        #         btn for btn in st.session_state.current_buttons
+        #         if btn["title"] == selected_title
+        #     )
+
+        #     # Add user's choice to history
+        #     add_message("user", selected_title)
+
+        #     # Send payload to Rasa
+        #     bot_messages = send_message_to_rasa(selected_button["payload"])
+
+        #     # Process bot responses
+        #     handle_bot_messages(bot_messages)
+        #     st.rerun(scope="fragment")
+
+    # ----------------------------------------------- #
+
+    # Regular text input (only show if not waiting for button response)
+    if not st.session_state.awaiting_button_response:
+        if user_input := st.chat_input("Type your message here..."):
+            # Add user message to history
+            add_message("user", user_input)
+            with st.chat_message("user"):
+                st.write(user_input)
+
+            # Send to Rasa; bot messages are drawn as soon as each one arrives
+            handle_bot_messages(send_message_to_rasa(user_input))
+
+            # New messages are already on screen; only redraw when buttons must appear
+            if st.session_state.awaiting_button_response:
+                st.rerun(scope="fragment")
+
+
+chat()
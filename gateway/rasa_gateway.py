@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Async gateway between the chat clients and one or more Rasa servers.
+
+Speaks the Rasa REST channel protocol, so clients only change the URL:
+
+    RASA_UPSTREAMS=http://localhost:5005,http://localhost:5006 python gateway/rasa_gateway.py
+    RASA_ENDPOINT=http://localhost:5010/webhooks/rest/webhook streamlit run chat_ui/my_app_2.py
+
+What it adds in front of Rasa:
+  - per-sender ordering: a sender's turns reach Rasa one at a time, in order,
+    and at most GATEWAY_MAX_PENDING_PER_SENDER of them wait in line
+  - backpressure: each Rasa instance serves at most GATEWAY_MAX_CONCURRENCY
+    turns at once, at most GATEWAY_MAX_QUEUE turns wait for a slot, and a turn
+    that waited GATEWAY_QUEUE_TIMEOUT seconds is shed with a friendly "busy" reply
+  - sticky routing: rendezvous hashing keeps every sender on the same Rasa
+    instance (falling back to the next-best one if it is unreachable)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+UPSTREAMS = [url.strip().rstrip("/") for url in os.getenv("RASA_UPSTREAMS", "http://localhost:5005").split(",") if url.strip()]
+WEBHOOK_PATH = "/webhooks/rest/webhook"
+
+MAX_CONCURRENCY = int(os.getenv("GATEWAY_MAX_CONCURRENCY", 16))  # per Rasa instance
+MAX_QUEUE = int(os.getenv("GATEWAY_MAX_QUEUE", 200))  # turns waiting for a slot, all instances
+QUEUE_TIMEOUT = float(os.getenv("GATEWAY_QUEUE_TIMEOUT", 20))
+MAX_PENDING_PER_SENDER = int(os.getenv("GATEWAY_MAX_PENDING_PER_SENDER", 3))
+UPSTREAM_TIMEOUT = float(os.getenv("GATEWAY_UPSTREAM_TIMEOUT", 120))
+BUSY_MESSAGE = os.getenv(
+    "GATEWAY_BUSY_MESSAGE",
+    "Lots of students are chatting with me right now, so I couldn't get to your message. "
+    "Please try again in a few seconds.",
+)
+SLOW_DOWN_MESSAGE = "I'm still working on your previous messages. Please wait for my reply before sending more."
+
+logger = logging.getLogger("rasa_gateway")
+
+
+class ShedError(Exception):
+    """A turn was refused to protect the Rasa servers; `reason` goes to the stats."""
+
+    def __init__(self, reason: str, message: str = BUSY_MESSAGE):
+        super().__init__(reason)
+        self.reason = reason
+        self.message = message
+
+
+def rank_upstreams(sender_id: str, upstreams: List[str]) -> List[str]:
+    """
+    Rendezvous (highest random weight) hashing: every sender gets a stable
+    preference order of upstreams, and adding or removing one only moves the
+    senders that preferred it.
+    """
+    def weight(upstream: str) -> int:
+        return int.from_bytes(hashlib.blake2b(f"{upstream}|{sender_id}".encode(), digest_size=8).digest(), "big")
+    return sorted(upstreams, key=weight, reverse=True)
+
+
+class _SenderLane:
+    """Serializes the turns of one sender; `pending` counts turns holding or waiting for the lock."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class Ticket:
+    """An admitted turn: holds its sender's lane and a slot on `upstream` until released."""
+
+    def __init__(self, sender_id: str, lane: _SenderLane, upstream: str):
+        self.sender_id = sender_id
+        self.lane = lane
+        self.upstream = upstream
+        self.tried = [upstream]
+
+
+class Gateway:
+    """Admission control and routing; one instance per process."""
+
+    def __init__(self, upstreams: List[str], down_for: float = 10.0):
+        self.upstreams = upstreams
+        self.down_for = down_for
+        self._slots = {upstream: asyncio.Semaphore(MAX_CONCURRENCY) for upstream in upstreams}
+        self._lanes: Dict[str, _SenderLane] = {}
+        self._down_until = {upstream: 0.0 for upstream in upstreams}
+        self.queued = 0
+        self.in_flight = {upstream: 0 for upstream in upstreams}
+        self.shed: Dict[str, int] = {}
+        self.served = 0
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def shed_error(self, reason: str, message: str = BUSY_MESSAGE) -> ShedError:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        return ShedError(reason, message)
+
+    def _pick(self, sender_id: str, exclude: List[str]) -> Optional[str]:
+        """The sender's most preferred upstream that is not excluded, preferring ones not marked down."""
+        now = time.monotonic()
+        candidates = [u for u in rank_upstreams(sender_id, self.upstreams) if u not in exclude]
+        healthy = [u for u in candidates if self._down_until[u] <= now]
+        return (healthy or candidates or [None])[0]
+
+    async def _wait_for(self, primitive, deadline: float) -> None:
+        """Acquires a lock/semaphore, counting the turn as queued only while it actually waits."""
+        if not primitive.locked():
+            await primitive.acquire()
+            return
+        self.queued += 1
+        try:
+            await asyncio.wait_for(primitive.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise self.shed_error("queue_timeout") from None
+        finally:
+            self.queued -= 1
+
+    async def _acquire_slot(self, upstream: str, deadline: float) -> None:
+        await self._wait_for(self._slots[upstream], deadline)
+        self.in_flight[upstream] += 1
+
+    def _release_slot(self, upstream: str) -> None:
+        self.in_flight[upstream] -= 1
+        self._slots[upstream].release()
+
+    async def admit(self, sender_id: str) -> Ticket:
+        """
+        Waits for the sender's previous turns to finish and for a slot on its
+        upstream. Raises ShedError instead of queueing without bound.
+        """
+        lane = self._lanes.get(sender_id)
+        if lane is not None and lane.pending >= MAX_PENDING_PER_SENDER:
+            raise self.shed_error("sender_queue_full", SLOW_DOWN_MESSAGE)
+        if self.queued >= MAX_QUEUE:
+            raise self.shed_error("queue_full")
+
+        lane = self._lanes.setdefault(sender_id, _SenderLane())
+        lane.pending += 1
+        deadline = time.monotonic() + QUEUE_TIMEOUT
+        try:
+            await self._wait_for(lane.lock, deadline)
+        except BaseException:
+            self._leave_lane(sender_id, lane)
+            raise
+
+        upstream = self._pick(sender_id, exclude=[])
+        try:
+            await self._acquire_slot(upstream, deadline)
+        except BaseException:
+            lane.lock.release()
+            self._leave_lane(sender_id, lane)
+            raise
+        return Ticket(sender_id, lane, upstream)
+
+    async def failover(self, ticket: Ticket) -> bool:
+        """
+        Marks the ticket's upstream as down and moves the turn to the sender's
+        next preferred upstream. Returns False when none is left.
+        """
+        self._down_until[ticket.upstream] = time.monotonic() + self.down_for
+        self._release_slot(ticket.upstream)
+        ticket.upstream = None
+        upstream = self._pick(ticket.sender_id, exclude=ticket.tried)
+        if upstream is None:
+            return False
+        await self._acquire_slot(upstream, time.monotonic() + QUEUE_TIMEOUT)
+        ticket.upstream = upstream
+        ticket.tried.append(upstream)
+        return True
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket.upstream is not None:
+            self._release_slot(ticket.upstream)
+            ticket.upstream = None
+        ticket.lane.lock.release()
+        self._leave_lane(ticket.sender_id, ticket.lane)
+
+    def _leave_lane(self, sender_id: str, lane: _SenderLane) -> None:
+        lane.pending -= 1
+        if lane.pending == 0 and self._lanes.get(sender_id) is lane:
+            del self._lanes[sender_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstreams": self.upstreams,
+            "down": [u for u, until in self._down_until.items() if until > time.monotonic()],
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "active_senders": len(self._lanes),
+            "served": self.served,
+            "shed": self.shed,
+            "limits": {
+                "max_concurrency_per_upstream": MAX_CONCURRENCY,
+                "max_queue": MAX_QUEUE,
+                "queue_timeout": QUEUE_TIMEOUT,
+                "max_pending_per_sender": MAX_PENDING_PER_SENDER,
+            },
+        }
+
+
+gateway = Gateway(UPSTREAMS)
+
+
+def _busy_reply(sender_id: str, error: ShedError, stream: bool) -> Response:
+    # 200 with a normal bot message, so every client simply shows it
+    message = {"recipient_id": sender_id, "text": error.message}
+    headers = {"Retry-After": "5", "X-Gateway-Shed": error.reason}
+    if stream:
+        return Response(json.dumps(message) + "\n", media_type="text/event-stream", headers=headers)
+    return JSONResponse([message], headers=headers)
+
+
+async def webhook(request: Request) -> Response:
+    payload = await request.json()
+    sender_id = str(payload.get("sender") or "default")
+    stream = request.query_params.get("stream", "false").lower() == "true"
+
+    try:
+        ticket = await gateway.admit(sender_id)
+    except ShedError as e:
+        logger.warning("Shed turn of %s (%s)", sender_id, e.reason)
+        return _busy_reply(sender_id, e, stream)
+
+    try:
+        while True:
+            upstream_request = gateway.client.build_request(
+                "POST", ticket.upstream + WEBHOOK_PATH, params=request.query_params, json=payload
+            )
+            try:
+                upstream_response = await gateway.client.send(upstream_request, stream=True)
+                break
+            except httpx.ConnectError as e:
+                # Rasa never saw the turn, so it is safe to send it elsewhere
+                logger.warning("Rasa upstream %s unreachable: %s", ticket.upstream, e)
+                if not await gateway.failover(ticket):
+                    raise
+    except (httpx.HTTPError, ShedError) as e:
+        gateway.release(ticket)
+        logger.warning("Turn of %s failed upstream: %s", sender_id, e)
+        return _busy_reply(sender_id, e if isinstance(e, ShedError) else gateway.shed_error("upstream_error"), stream)
+    except BaseException:
+        gateway.release(ticket)
+        raise
+
+    async def _relay() -> AsyncIterator[bytes]:
+        # The sender's lane and the upstream slot are held until the last byte is relayed
+        try:
+            async for chunk in upstream_response.aiter_raw():
+                yield chunk
+            gateway.served += 1
+        finally:
+            await upstream_response.aclose()
+            gateway.release(ticket)
+
+    return StreamingResponse(
+        _relay(),
+        status_code=upstream_response.status_code,
+        media_type=upstream_response.headers.get("content-type"),
+    )
+
+
+async def stats(_request: Request) -> JSONResponse:
+    return JSONResponse(gateway.stats())
+
+
+async def health(_request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+@asynccontextmanager
+async def lifespan(_app: Starlette):
+    gateway.client = httpx.AsyncClient(
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENCY * len(UPSTREAMS),
+            max_keepalive_connections=MAX_CONCURRENCY * len(UPSTREAMS),
+        ),
+    )
+    try:
+        yield
+    finally:
+        await gateway.client.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route(WEBHOOK_PATH, webhook, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # A single process: admission state (queues, slots) must be shared by all requests
+    uvicorn.run(app, host=os.getenv("GATEWAY_HOST", "127.0.0.1"), port=int(os.getenv("GATEWAY_PORT", 5010)))
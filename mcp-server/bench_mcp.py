@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the MCP career search server.
+
+Opens many concurrent MCP sessions, calls every tool from a mixed workload
+and writes a JSON report (p50/p95/p99 latency, throughput, error rates per
+tool) that can be diffed between releases. Run it against the offline stand-in
+to avoid burning API credits:
+
+    python fake_tavily.py --latency-ms 800 --jitter-ms 300 &
+    TAVILY_API_KEY=fake TAVILY_API_BASE_URL=http://127.0.0.1:8900 python main_1.py &
+    python bench_mcp.py --sessions 50 --calls 20 --output bench_report.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from fastmcp import Client
+
+# (tool, arguments) pairs modelled on real sub-agent traffic
+WORKLOAD: List[Tuple[str, Dict[str, Any]]] = [
+    ("search_uk_career_info", {"query": "software engineer graduate schemes London", "focus": "general"}),
+    ("search_uk_career_info", {"query": "data analyst graduate salary", "focus": "salary"}),
+    ("search_uk_career_info", {"query": "graduate route after computer science degree", "focus": "visas"}),
+    ("search_uk_career_info", {"query": "cyber security job market", "focus": "trends"}),
+    ("search_uk_career_info", {"query": "summer internship applications finance", "focus": "deadlines"}),
+    ("extract_wlv_campus_info", {"query": "printing and scanning"}),
+    ("extract_wlv_campus_info", {"query": "library opening hours"}),
+    ("extract_wlv_campus_info", {"query": "enrolment"}),
+    ("extract_wlv_campus_info", {"query": "laptop loan"}),
+    ("get_uk_company_info", {"company_name": "PwC"}),
+    ("get_uk_company_info", {"company_name": "Jaguar Land Rover"}),
+    ("ping", {}),
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (already in milliseconds)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return round(ordered[rank], 2)
+
+
+async def run_session(url: str, calls: int, workload: List[Tuple[str, Dict[str, Any]]],
+                      samples: Dict[str, List[float]], errors: Dict[str, Dict[str, int]]) -> None:
+    """One MCP session issuing `calls` tool calls back to back."""
+    try:
+        async with Client(url) as client:
+            for _ in range(calls):
+                tool, arguments = random.choice(workload)
+                started = time.perf_counter()
+                try:
+                    await client.call_tool(tool, arguments)
+                    samples[tool].append((time.perf_counter() - started) * 1000)
+                except Exception as e:
+                    errors[tool][type(e).__name__] += 1
+    except Exception as e:
+        errors["session"][type(e).__name__] += 1
+
+
+def build_report(args: argparse.Namespace, samples: Dict[str, List[float]],
+                 errors: Dict[str, Dict[str, int]], wall_time: float) -> Dict[str, Any]:
+    tools = {}
+    for tool in sorted(set(samples) | set(errors)):
+        ok = len(samples.get(tool, []))
+        failed = sum(errors.get(tool, {}).values())
+        latencies = samples.get(tool, [])
+        tools[tool] = {
+            "calls": ok + failed,
+            "errors": dict(errors.get(tool, {})),
+            "error_rate": round(failed / (ok + failed), 4) if ok + failed else 0.0,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": round(max(latencies), 2) if latencies else 0.0,
+            },
+        }
+
+    all_latencies = [v for values in samples.values() for v in values]
+    total_ok = len(all_latencies)
+    total_failed = sum(sum(e.values()) for e in errors.values())
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "config": {"url": args.url, "sessions": args.sessions, "calls_per_session": args.calls},
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(total_ok / wall_time, 2) if wall_time else 0.0,
+        "total_calls": total_ok + total_failed,
+        "error_rate": round(total_failed / (total_ok + total_failed), 4) if total_ok + total_failed else 0.0,
+        "latency_ms": {
+            "p50": percentile(all_latencies, 50),
+            "p95": percentile(all_latencies, 95),
+            "p99": percentile(all_latencies, 99),
+        },
+        "tools": tools,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    workload = [item for item in WORKLOAD if not args.tools or item[0] in args.tools]
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        run_session(args.url, args.calls, workload, samples, errors) for _ in range(args.sessions)
+    ])
+    return build_report(args, samples, errors, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent MCP tool benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/mcp")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent MCP sessions")
+    parser.add_argument("--calls", type=int, default=10, help="Tool calls per session")
+    parser.add_argument("--tools", nargs="*", help="Only benchmark these tools")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_report.json")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = asyncio.run(main_async(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Throughput: {report['throughput_rps']} calls/s, error rate: {report['error_rate']:.2%}")
+    for tool, stats in report["tools"].items():
+        latency = stats["latency_ms"]
+        print(f"  {tool:<26} n={stats['calls']:<5} p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Cache warm-up for the MCP career search server.
+
+Runs a list of popular queries (warm_queries.json, optionally topped up with
+the most frequent queries mined from the server's JSON logs) through the
+tools at start-up and again every day off-peak, so the first students of the
+morning are answered from the cache instead of waiting on Tavily. With
+several worker processes, a lock file lets only one of them warm at a time.
+
+Run it directly to see what would be mined from a log file:
+
+    python cache_warmer.py --logs mcp.log --top 20
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import glob
+import json
+import os
+import random
+from collections import Counter
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from logger_utils import get_logger
+from metrics import current_tool
+from rate_limit import BACKGROUND, request_priority
+from search_cache import normalize_text
+
+DEFAULT_QUERIES_FILE = Path(__file__).resolve().parent / "warm_queries.json"
+
+# Tools whose calls can be warmed, with the parameters that identify a call
+WARMABLE_TOOLS = {
+    "search_uk_career_info": ("query", "focus"),
+    "extract_wlv_campus_info": ("query",),
+}
+
+logger = get_logger("cache_warmer")
+
+
+def load_warm_queries(path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Reads the configured warm-up list: `{"<tool>": [{"query": ..., "focus": ...}, ...]}`.
+
+    Returns:
+        list: {"tool": ..., "params": {...}} jobs (empty if the file does not exist).
+    """
+    path = Path(path or os.getenv("WARM_QUERIES_FILE") or DEFAULT_QUERIES_FILE)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return [
+        {"tool": tool, "params": {name: item[name] for name in WARMABLE_TOOLS[tool] if name in item}}
+        for tool, items in config.items() if tool in WARMABLE_TOOLS
+        for item in items
+    ]
+
+
+def mine_log_queries(lines: Iterable[str], top_n: int = 20, since: Optional[dt.datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Finds the most frequent tool calls in JSON log lines (the "tool_call"
+    events the tools log for every request).
+
+    Args:
+        lines: Log lines; anything that is not a JSON tool-call record is skipped.
+        top_n (int): Calls to keep per tool.
+        since (datetime): Ignore records older than this (timezone-aware).
+
+    Returns:
+        list: {"tool": ..., "params": {...}} jobs, most frequent first.
+    """
+    counts: Dict[str, Counter] = {tool: Counter() for tool in WARMABLE_TOOLS}
+    for line in lines:
+        if '"tool_call"' not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        tool = record.get("logger")
+        if record.get("event") != "tool_call" or tool not in counts or not record.get("query"):
+            continue
+        if since is not None and dt.datetime.fromisoformat(record["ts"]) < since:
+            continue
+        params = tuple((name, normalize_text(str(record.get(name) or "general"))) for name in WARMABLE_TOOLS[tool])
+        counts[tool][params] += 1
+
+    return [
+        {"tool": tool, "params": dict(params)}
+        for tool, counter in counts.items()
+        for params, _ in counter.most_common(top_n)
+    ]
+
+
+def mine_log_files(pattern: str, top_n: int = 20, hours: float = 72) -> List[Dict[str, Any]]:
+    """Runs `mine_log_queries` over every file matching the glob `pattern`."""
+    since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=hours)
+
+    def _lines():
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                yield from f
+
+    return mine_log_queries(_lines(), top_n=top_n, since=since)
+
+
+def _dedupe(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    unique = {}
+    for job in jobs:
+        key = (job["tool"], tuple(sorted((k, normalize_text(str(v))) for k, v in job["params"].items())))
+        unique.setdefault(key, job)
+    return list(unique.values())
+
+
+def seconds_until(clock: str, now: Optional[dt.datetime] = None) -> float:
+    """Seconds from `now` (local time) until the next "HH:MM"."""
+    now = now or dt.datetime.now()
+    hour, minute = (int(part) for part in clock.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += dt.timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def try_lock(path: str) -> Optional[IO]:
+    """
+    Takes an exclusive lock on `path` without waiting.
+
+    Returns:
+        The open lock file (close it to release the lock; the OS also releases
+        it when the process dies), or None when another process holds it.
+    """
+    f = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class CacheWarmer:
+    """
+    Periodically runs warm-up jobs through `warm(tool, params)`, a coroutine
+    supplied by the server that fetches a call and stores it in the caches.
+
+    Jobs run a few at a time with BACKGROUND rate-limit priority, so real tool
+    calls arriving meanwhile are served first. With a `lock_path` shared by
+    the worker processes, a run is skipped while another worker is warming.
+    """
+
+    def __init__(
+        self,
+        warm: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        refresh_at: str = "05:30",
+        concurrency: int = 2,
+        log_pattern: Optional[str] = None,
+        log_top_n: int = 20,
+        log_hours: float = 72,
+        lock_path: Optional[str] = None,
+    ):
+        self.warm = warm
+        self.refresh_at = refresh_at
+        self.concurrency = concurrency
+        self.log_pattern = log_pattern
+        self.log_top_n = log_top_n
+        self.log_hours = log_hours
+        self.lock_path = lock_path
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """The configured queries plus, if a log pattern is set, the most frequent logged ones."""
+        jobs = load_warm_queries()
+        if self.log_pattern:
+            jobs += mine_log_files(self.log_pattern, top_n=self.log_top_n, hours=self.log_hours)
+        return _dedupe(jobs)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Warms every job once and returns a summary (also kept in `last_run`)."""
+        lock = try_lock(self.lock_path) if self.lock_path else None
+        if self.lock_path and lock is None:
+            logger.info("Cache warm-up skipped: another worker is warming")
+            self.last_run = {"started": dt.datetime.now(dt.timezone.utc).isoformat(), "skipped": True}
+            return self.last_run
+
+        token = request_priority.set(BACKGROUND)
+        try:
+            return await self._run_jobs()
+        finally:
+            request_priority.reset(token)
+            if lock is not None:
+                lock.close()
+
+    async def _run_jobs(self) -> Dict[str, Any]:
+        jobs = await asyncio.to_thread(self.jobs)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = dt.datetime.now(dt.timezone.utc)
+
+        async def _run(job: Dict[str, Any]) -> bool:
+            async with semaphore:
+                # Upstream metrics of the warm-up are labelled with the tool being warmed
+                token = current_tool.set(job["tool"])
+                try:
+                    await self.warm(job["tool"], job["params"])
+                    return True
+                except Exception as e:
+                    logger.warning("Warm-up of %s %s failed: %s", job["tool"], job["params"], e)
+                    return False
+                finally:
+                    current_tool.reset(token)
+
+        results = await asyncio.gather(*[_run(job) for job in jobs])
+        self.last_run = {
+            "started": started.isoformat(),
+            "jobs": len(jobs),
+            "failed": results.count(False),
+            "seconds": round((dt.datetime.now(dt.timezone.utc) - started).total_seconds(), 1),
+        }
+        logger.info("Cache warm-up done: %d jobs, %d failed", len(jobs), results.count(False),
+                    extra={"fields": self.last_run})
+        return self.last_run
+
+    async def run_forever(self, boot_delay: float = 5.0) -> None:
+        """Warms shortly after start-up, then every day at `refresh_at` (server local time)."""
+        # Jitter keeps several worker processes from warming in lock-step
+        await asyncio.sleep(boot_delay + random.uniform(0, boot_delay))
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("Cache warm-up run failed: %s", e)
+            await asyncio.sleep(seconds_until(self.refresh_at))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the warm-up jobs mined from MCP server JSON logs")
+    parser.add_argument("--logs", required=True, help="Glob of JSON log files, e.g. 'logs/mcp-*.log'")
+    parser.add_argument("--top", type=int, default=20, help="Queries to keep per tool")
+    parser.add_argument("--hours", type=float, default=72, help="Only count records this recent")
+    args = parser.parse_args()
+
+    mined = mine_log_files(args.logs, top_n=args.top, hours=args.hours)
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for job in mined:
+        grouped.setdefault(job["tool"], []).append(job["params"])
+    # Same layout as warm_queries.json, ready to paste into it
+    print(json.dumps(grouped, indent=2, ensure_ascii=False))
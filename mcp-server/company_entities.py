@@ -0,0 +1,80 @@
+import difflib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_ALIASES_FILE = Path(__file__).resolve().parent / "company_aliases.json"
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+# Words that never tell two employers apart ("PwC UK Ltd" is "PwC")
+_LEGAL_WORDS = frozenset(
+    "the uk gb ltd limited plc llp llc inc corp corporation group holdings".split()
+)
+
+
+def company_key(name: str) -> str:
+    """
+    Compact matching key for an employer name: lower-cased, "&" read as "and",
+    punctuation, legal-form / country words and spaces removed
+    ("Jaguar Land-Rover UK Ltd" -> "jaguarlandrover").
+    """
+    words = _NON_ALNUM.sub(" ", name.lower().replace("&", " and ")).split()
+    kept = [w for w in words if w not in _LEGAL_WORDS]
+    return "".join(kept or words)
+
+
+class CompanyResolver:
+    """
+    Maps the many spellings of an employer to one canonical entity.
+
+    Names are matched on `company_key`: first exactly against the alias table
+    (canonical name -> aliases), then fuzzily against the table's keys only,
+    to absorb typos ("Deloite", "Capgemni"). Other names are their own entity;
+    they are never matched against each other, so "Booths" stays apart from
+    "Boots" and the result doesn't depend on what was looked up before.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]], fuzzy_cutoff: float = 0.92,
+                 min_fuzzy_length: int = 5, min_length_ratio: float = 0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.min_fuzzy_length = min_fuzzy_length
+        self.min_length_ratio = min_length_ratio
+        self._canonical: Dict[str, str] = {}
+        for canonical, names in aliases.items():
+            for name in [canonical, *names]:
+                self._canonical[company_key(name)] = canonical
+
+    @classmethod
+    def from_file(cls, path: Optional[Path] = None, **kwargs) -> "CompanyResolver":
+        """Loads the alias table from `path` (default: COMPANY_ALIASES_FILE or company_aliases.json)."""
+        path = Path(path or os.getenv("COMPANY_ALIASES_FILE") or DEFAULT_ALIASES_FILE)
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def resolve(self, name: str) -> Tuple[str, str, str]:
+        """
+        Canonicalizes an employer name.
+
+        Returns:
+            (key, display_name, method): `key` identifies the entity (use it for
+            caching), `method` is "alias", "fuzzy" or "new".
+        """
+        key = company_key(name)
+        if key in self._canonical:
+            display = self._canonical[key]
+            return company_key(display), display, "alias"
+
+        if len(key) >= self.min_fuzzy_length:
+            # Names of very different lengths are different employers however similar their letters
+            candidates = [
+                known for known in self._canonical
+                if min(len(key), len(known)) / max(len(key), len(known)) >= self.min_length_ratio
+            ]
+            match = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+            if match:
+                display = self._canonical[match[0]]
+                return company_key(display), display, "fuzzy"
+
+        return key, " ".join(name.split()), "new"
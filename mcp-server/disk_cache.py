@@ -0,0 +1,103 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class DiskCache:
+    """
+    SQLite-backed cache shared by every MCP server process on the box.
+
+    Values are stored as zlib-compressed JSON with two timestamps: `expires_at`
+    (end of freshness) and `stale_until` (last moment the entry may still be
+    served while it is refreshed in the background). The database runs in WAL
+    mode so any number of worker processes can read while one writes.
+
+    All methods are blocking; call them from async code via `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str, stale_ttl: float = 24 * 3600.0):
+        self.path = path
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " stale_until REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tool_cache_stale ON tool_cache (stale_until)")
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"), ensure_ascii=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Looks up `key`.
+
+        Returns:
+            (value, expires_at) while the entry is fresh or still within its
+            stale window, otherwise None. Callers treat `expires_at <= time.time()`
+            as stale.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE key = ? AND stale_until > ?",
+                (self._encode_key(key), now),
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = row
+        if expires_at > now:
+            self.fresh_hits += 1
+        else:
+            self.stale_hits += 1
+        return json.loads(zlib.decompress(value)), expires_at
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Stores `value` under `key`, fresh for `ttl` seconds and servable as stale
+        for a further `stale_ttl` seconds.
+        """
+        now = time.time()
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, stored_at, expires_at, stale_until)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self._encode_key(key), blob, now, now + ttl, now + ttl + self.stale_ttl),
+            )
+
+    def purge_expired(self) -> int:
+        """Deletes entries past their stale window and returns how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM tool_cache WHERE stale_until <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the per-process lookup counters of the on-disk cache."""
+        return {
+            "path": self.path,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
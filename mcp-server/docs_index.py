@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+In-memory BM25 full-text index over the university documents in docs/.
+
+Lets extract_wlv_campus_info answer questions the local documents clearly
+cover (printing, laptop loans, MS 365, Canvas, ...) in milliseconds instead
+of going to the web. Run it directly to check how a query scores, or how the
+confidence gate does on the labelled queries in fixtures/local_docs/:
+
+    python docs_index.py "how do I top up my print credit"
+    python docs_index.py --check
+"""
+
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_DOCS_DIR = Path(__file__).resolve().parent.parent / "docs"
+LABELLED_QUERIES_FILE = Path(__file__).resolve().parent / "fixtures" / "local_docs" / "labelled_queries.json"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from get has have how i if in is it its me my "
+    "of on or our the their there this to use using was what when where which who will with "
+    "you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric tokens with common English stop words removed."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOP_WORDS]
+
+
+def chunk_text(text: str, max_chars: int = 700) -> List[str]:
+    """
+    Splits text into passages on blank lines, merging short paragraphs (and
+    splitting long ones on line breaks, then sentences) so each passage stays
+    under `max_chars`.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            line = line.strip()
+            if len(line) <= max_chars:
+                pieces.extend([line] if line else [])
+                continue
+            # Web page extracts are often one long line: fall back to sentences, then hard wraps
+            for sentence in re.split(r"(?<=[.!?])\s+", line):
+                pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of passages (dicts with at least a "text" key).
+    """
+
+    def __init__(self, passages: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(p["text"])) for p in passages]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if passages else 0.0
+        doc_freqs = Counter(term for tf in self._term_freqs for term in tf)
+        n = len(passages)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def score(self, query_terms: Iterable[str], i: int) -> float:
+        tf, length = self._term_freqs[i], self._lengths[i]
+        total = 0.0
+        for term in query_terms:
+            freq = tf.get(term)
+            if not freq:
+                continue
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length)
+            total += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+        return total
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Returns up to `top_k` passages (copies with "score" and "coverage" added)
+        ordered by BM25 score. `coverage` is the share of distinct query terms
+        that occur in the passage.
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.passages:
+            return []
+
+        scored = []
+        for i in range(len(self.passages)):
+            s = self.score(terms, i)
+            if s > 0:
+                scored.append((s, i))
+        scored.sort(reverse=True)
+
+        hits = []
+        for s, i in scored[:top_k]:
+            matched = sum(1 for term in terms if term in self._term_freqs[i])
+            hits.append({**self.passages[i], "score": round(s, 3), "coverage": round(matched / len(terms), 3)})
+        return hits
+
+
+def _related(a: str, b: str) -> bool:
+    # "print" / "printing", "password" / "passwords"
+    return a == b or (min(len(a), len(b)) >= 4 and (a.startswith(b) or b.startswith(a)))
+
+
+def confident_hits(
+    index: BM25Index,
+    query: str,
+    min_score: float = 4.0,
+    min_coverage: float = 0.75,
+    min_title_coverage: float = 0.5,
+    min_margin: float = 1.1,
+    top_k: int = 5,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Passages of the best-matching document when it clearly answers the query.
+
+    A high BM25 score alone is not enough ("library opening hours" scores well
+    against the printing guide, which mentions both words): the best passage
+    must also contain most query terms, its document's title must share at
+    least `min_title_coverage` of them, and it must beat the best passage of
+    any other document by a factor of `min_margin`.
+
+    Returns:
+        list: The hits from the best document that clear the score and
+        coverage bars, best first; None when the gate is not passed.
+    """
+    hits = index.search(query, top_k=max(top_k, 30))
+    if not hits:
+        return None
+
+    best = hits[0]
+    terms = set(tokenize(query))
+    title_terms = set(tokenize(best["title"]))
+    title_coverage = sum(1 for t in terms if any(_related(t, w) for w in title_terms)) / len(terms)
+    runner_up = next((h["score"] for h in hits if h["source"] != best["source"]), 0.0)
+    if (best["score"] < min_score or best["coverage"] < min_coverage or title_coverage < min_title_coverage
+            or (runner_up and best["score"] < min_margin * runner_up)):
+        return None
+
+    return [
+        h for h in hits
+        if h["source"] == best["source"] and h["score"] >= min_score and h["coverage"] >= min_coverage
+    ][:top_k]
+
+
+def check_gate(index: BM25Index, path: Path = LABELLED_QUERIES_FILE, **gate: Any) -> Dict[str, List[str]]:
+    """
+    Runs `confident_hits` over the labelled queries in `path`.
+
+    Returns:
+        dict: "missed" (labelled local, sent to the web) and "wrong" (labelled
+        web, answered locally) queries.
+    """
+    with open(path, encoding="utf-8") as f:
+        labelled = json.load(f)
+    return {
+        "missed": [q for q in labelled["local"] if confident_hits(index, q, **gate) is None],
+        "wrong": [q for q in labelled["web"] if confident_hits(index, q, **gate) is not None],
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def select_passages(
+    query: str,
+    documents: List[Dict[str, Any]],
+    top_k: int = 5,
+    max_tokens: int = 800,
+    chunk_chars: int = 500,
+) -> List[Dict[str, Any]]:
+    """
+    Chunks fetched documents, scores every chunk against the query with BM25
+    and keeps the best ones that fit in the token budget.
+
+    Chunks no query term matches are only used to fill remaining slots, in the
+    order the documents were ranked upstream.
+
+    Args:
+        query (str): The user's question.
+        documents (list): Dicts with "title", "url" and "content".
+        top_k (int): Maximum number of passages to return.
+        max_tokens (int): Budget for the combined passage text.
+        chunk_chars (int): Target passage size in characters.
+
+    Returns:
+        list: Up to `top_k` {"title", "url", "content"} passages, best first.
+    """
+    chunks = [
+        {"title": doc["title"], "url": doc["url"], "text": chunk, "rank": rank}
+        for rank, doc in enumerate(documents)
+        for chunk in chunk_text(doc.get("content", ""), max_chars=chunk_chars)
+    ]
+    if not chunks:
+        return []
+
+    index = BM25Index(chunks)
+    terms = set(tokenize(query))
+    ranked = sorted(
+        range(len(chunks)),
+        key=lambda i: (-index.score(terms, i), chunks[i]["rank"], i)
+    )
+
+    selected, used_tokens = [], 0
+    for i in ranked:
+        if len(selected) >= top_k:
+            break
+        tokens = estimate_tokens(chunks[i]["text"])
+        if used_tokens + tokens > max_tokens:
+            continue
+        used_tokens += tokens
+        selected.append({"title": chunks[i]["title"], "url": chunks[i]["url"], "content": chunks[i]["text"]})
+    return selected
+
+
+def build_docs_index(docs_dir: Optional[Path] = None) -> BM25Index:
+    """
+    Chunks every .txt file under `docs_dir` (default: the repo's docs/ folder,
+    or LOCAL_DOCS_DIR) and indexes the passages.
+
+    Returns:
+        BM25Index: Passages carry "title" (first line of the file), "source"
+        (path relative to the docs folder) and "text".
+    """
+    docs_dir = Path(docs_dir or os.getenv("LOCAL_DOCS_DIR") or DEFAULT_DOCS_DIR)
+    passages = []
+    for path in sorted(docs_dir.rglob("*.txt")):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        title = next((line.strip().rstrip(":") for line in text.splitlines() if line.strip()), path.stem)
+        source = f"docs/{path.relative_to(docs_dir).as_posix()}"
+        for chunk in chunk_text(text):
+            passages.append({"title": title, "source": source, "text": chunk})
+    return BM25Index(passages)
+
+
+if __name__ == "__main__":
+    index = build_docs_index()
+    print(f"Indexed {len(index.passages)} passages")
+    if sys.argv[1:] == ["--check"]:
+        result = check_gate(index)
+        print(f"Labelled local but sent to the web: {result['missed']}")
+        print(f"Labelled web but answered locally: {result['wrong']}")
+        sys.exit(1 if result["wrong"] else 0)
+    query = " ".join(sys.argv[1:]) or "print credit"
+    print(f"Confident: {confident_hits(index, query) is not None}")
+    for hit in index.search(query, top_k=5):
+        print(f"\n[{hit['score']} | coverage {hit['coverage']}] {hit['source']}\n{hit['text'][:300]}")
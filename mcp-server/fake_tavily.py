@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Tavily search API, for load-testing the MCP server
+without spending API credits.
+
+Point the MCP server at it with TAVILY_API_BASE_URL:
+
+    python fake_tavily.py --port 8900 --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+    TAVILY_API_KEY=fake TAVILY_API_BASE_URL=http://127.0.0.1:8900 python main_1.py
+
+Responses come from, in order:
+  1. recorded responses (fixtures/tavily/recorded/<hash>.json) for the exact request
+  2. keyword fixtures (fixtures/tavily/*.json, tried in file name order) with a
+     "match" phrase whose words all occur in the query; a "topic:<topic>" word
+     matches the request's topic. A fixture with empty "results" answers a miss
+  3. a synthetic response built from the query
+
+With --record, requests without a recording are forwarded to the real API
+(TAVILY_API_KEY) once and saved under fixtures/tavily/recorded/.
+"""
+
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import random
+import string
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "tavily"
+TAVILY_API_URL = "https://api.tavily.com"
+
+# Request fields that change the upstream answer (everything else, e.g. timeouts, is ignored)
+_KEY_FIELDS = ("query", "search_depth", "topic", "max_results", "include_domains", "include_answer", "country")
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Stable hash of the answer-relevant part of a search request."""
+    relevant = {field: payload.get(field) for field in _KEY_FIELDS}
+    relevant["query"] = " ".join(str(relevant["query"] or "").lower().split())
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+def match_terms(text: str) -> Set[str]:
+    """Lower-cased words of `text`, without surrounding punctuation."""
+    return {word.strip(string.punctuation) for word in text.lower().split()} - {""}
+
+
+def load_fixtures(fixtures_dir: Path) -> List[Dict[str, Any]]:
+    """Loads the keyword fixtures (files directly inside `fixtures_dir`)."""
+    fixtures = []
+    for path in sorted(fixtures_dir.glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        # Split on whitespace only, like match_terms: "site:wlv.ac.uk" stays one word
+        fixture["match"] = [set(phrase.lower().split()) for phrase in fixture.get("match", [])]
+        fixtures.append(fixture)
+    return fixtures
+
+
+def synthetic_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds a plausible search response when no fixture matches."""
+    query = payload.get("query", "")
+    domain = (payload.get("include_domains") or ["example.co.uk"])[0]
+    max_results = int(payload.get("max_results") or 5)
+    results = [
+        {
+            "title": f"Result {i + 1} for {query}",
+            "url": f"https://www.{domain}/search/{i + 1}",
+            "content": f"Synthetic content about {query}. " * 5,
+            "score": round(0.9 - i * 0.07, 2),
+        }
+        for i in range(max_results)
+    ]
+    return {
+        "query": query,
+        "answer": f"Synthetic answer for '{query}'." if payload.get("include_answer") else None,
+        "follow_up_questions": None,
+        "results": results,
+        "response_time": 0.0,
+    }
+
+
+class FakeTavily:
+    """Serves fixture responses with configurable latency and failure injection."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Optional[List[int]] = None,
+        fixtures_dir: Path = FIXTURES_DIR,
+        record: bool = False,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [500]
+        self.fixtures_dir = fixtures_dir
+        self.recorded_dir = fixtures_dir / "recorded"
+        self.fixtures = load_fixtures(fixtures_dir)
+        self.record = record
+        self.requests = 0
+        self.errors = 0
+
+    def _match_terms(self, payload: Dict[str, Any]) -> Set[str]:
+        terms = match_terms(str(payload.get("query", "")))
+        if payload.get("topic"):
+            terms.add(f"topic:{payload['topic']}")
+        return terms
+
+    def _lookup(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        recorded = self.recorded_dir / f"{request_key(payload)}.json"
+        if recorded.exists():
+            with open(recorded, "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+
+        terms = self._match_terms(payload)
+        for fixture in self.fixtures:
+            if any(phrase <= terms for phrase in fixture["match"]):
+                response = copy.deepcopy(fixture["response"])
+                response["query"] = payload.get("query", "")
+                return response
+        return None
+
+    async def _record(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        api_key = os.getenv("TAVILY_API_KEY")
+        async with httpx.AsyncClient(base_url=TAVILY_API_URL, timeout=60) as client:
+            upstream = await client.post(
+                "/search", json=payload, headers={"Authorization": f"Bearer {api_key}"}
+            )
+        upstream.raise_for_status()
+        response = upstream.json()
+        self.recorded_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.recorded_dir / f"{request_key(payload)}.json", "w", encoding="utf-8") as f:
+            json.dump({"request": payload, "response": response}, f, indent=2, ensure_ascii=False)
+        return response
+
+    async def search(self, payload: Dict[str, Any]) -> JSONResponse:
+        self.requests += 1
+        delay_ms = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse(
+                status_code=random.choice(self.error_statuses),
+                content={"detail": {"error": "Injected failure from fake Tavily"}},
+            )
+
+        response = self._lookup(payload)
+        if response is None:
+            response = await self._record(payload) if self.record else synthetic_response(payload)
+        return JSONResponse(content=response)
+
+
+def create_app(fake: FakeTavily) -> FastAPI:
+    app = FastAPI(title="Fake Tavily")
+
+    @app.post("/search")
+    async def search(request: Request) -> JSONResponse:
+        return await fake.search(await request.json())
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return {"requests": fake.requests, "injected_errors": fake.errors}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Tavily stand-in for MCP load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Std-dev of the latency (gaussian)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+    parser.add_argument("--error-status", default="500", help="Comma-separated HTTP statuses for injected failures")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    parser.add_argument("--record", action="store_true", help="Forward unknown requests to Tavily and save them")
+    args = parser.parse_args()
+
+    fake = FakeTavily(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_status.split(",")],
+        fixtures_dir=args.fixtures,
+        record=args.record,
+    )
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
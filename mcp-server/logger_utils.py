@@ -1,11 +1,128 @@
+# Vendored as actions/general/logger_utils.py and mcp-server/logger_utils.py — keep
+# both copies identical. The MCP server is a separate project (own pyproject.toml, run
+# from mcp-server/ with flat imports) and the action server doesn't ship mcp-server/,
+# so neither can import the other's copy.
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Output format: "json" (one object per line) or "text" (the classic human-readable layout)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Longest value kept for the message and any single structured field
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", 2000))
+# Share of verbose payload logs (full tool outputs etc.) that are actually emitted
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.05))
+# Records waiting for the writer thread; beyond this, new records are dropped instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_setup_lock = threading.Lock()
+
+
+def _truncate(value: Any, limit: int = LOG_MAX_FIELD_CHARS) -> Any:
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        if len(text) <= limit:
+            return value
+    else:
+        text = value if isinstance(value, str) else repr(value)
+    if len(text) > limit:
+        return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Renders a record as one JSON line, truncating the message and every
+    structured field passed as `extra={"fields": {...}}`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _truncate(record.getMessage()),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = _truncate(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Classic text layout with the same per-field truncation as the JSON output."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={_truncate(v)}" for k, v in fields.items())
+        return _truncate(line, LOG_MAX_FIELD_CHARS * 2)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting (JSON serialization, truncation) to the
+    writer thread. Only the message is interpolated on the calling thread, so
+    arguments changed after the call are logged as they were. When the queue is
+    full the record is dropped rather than blocking the request.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def _get_queue_handler() -> logging.Handler:
+    """Starts the process-wide background writer on first use."""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _queue_handler is None:
+            log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+            _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+            _listener.start()
+            # Flush whatever is still queued when the process exits
+            atexit.register(_listener.stop)
+            _queue_handler = _LazyQueueHandler(log_queue)
+    return _queue_handler
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Configures and returns a custom logger instance for a given module/action name.
     This ensures logs are formatted consistently and only attached once to stdout.
 
+    Records are handed to a queue and written by a background thread, so slow
+    stdout writes and message formatting stay off the request path. Pass
+    arguments lazily (`logger.info("found %s", value)`) rather than with f-strings.
+
     Args:
         name (str): The name of the logger (usually the name of the custom action class).
 
@@ -15,21 +132,36 @@ def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
 
     # Set the minimum level for this logger (e.g., INFO, DEBUG, WARNING)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
     # Prevent re-initialization and duplicate handlers
     if not logger.handlers:
-        # Create a StreamHandler to output logs to console (stdout)
-        handler = logging.StreamHandler(sys.stdout)
-
-        # Define the log format
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger.addHandler(_get_queue_handler())
 
     # 🔧 Prevent this logger from propagating messages to the root logger
     logger.propagate = False
 
     return logger
+
+
+def log_payload(
+    logger: logging.Logger,
+    message: str,
+    sample_rate: Optional[float] = None,
+    level: int = logging.INFO,
+    **fields: Any,
+) -> None:
+    """
+    Logs a verbose payload (full tool output, tracker dump, ...) for only a
+    sample of calls. Each field is truncated to LOG_MAX_FIELD_CHARS when written.
+
+    Args:
+        logger (logging.Logger): Logger from `get_logger`.
+        message (str): Short description of the payload.
+        sample_rate (float): Share of calls to log (default: LOG_PAYLOAD_SAMPLE_RATE).
+        level (int): Log level of the record.
+        **fields: Structured fields written alongside the message.
+    """
+    rate = LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+    if logger.isEnabledFor(level) and random.random() < rate:
+        logger.log(level, message, extra={"fields": fields})
@@ -1,5 +1,5 @@
 from mcp.server.fastmcp import FastMCP
-from tavily import TavilyClient
+from tavily_async import create_tavily_client
 import os
 from dotenv import load_dotenv
 
@@ -13,14 +13,15 @@ tavily_api_key = os.getenv("TAVILY_API_KEY")
 if not tavily_api_key:
     raise ValueError("TAVILY_API_KEY environment variable must be set")
 
-tavily_client = TavilyClient(api_key=tavily_api_key)
+# Shared pooled async client (see tavily_async.py) so the tools never block the event loop
+tavily_client = create_tavily_client(tavily_api_key)
 
 
 @server.tool()
-def search_job_market_trends(query: str) -> str:
+async def search_job_market_trends(query: str) -> str:
     """Search for job market trends. Args: query (description of the job field or industry)"""
     try:
-        response = tavily_client.search(
+        response = await tavily_client.search(
             query=f"job market trends {query}",
             include_answer=True,
             search_depth="advanced"
@@ -33,10 +34,10 @@ def search_job_market_trends(query: str) -> str:
 
 
 @server.tool()
-def find_salary_data(query: str) -> str:
+async def find_salary_data(query: str) -> str:
     """Find salary data for a specific role. Args: query (job title, role, or skill set)"""
     try:
-        response = tavily_client.search(
+        response = await tavily_client.search(
             query=f"salary data {query}",
             include_answer=True,
             search_depth="advanced"
@@ -49,10 +50,10 @@ def find_salary_data(query: str) -> str:
 
 
 @server.tool()
-def get_industry_insights(query: str) -> str:
+async def get_industry_insights(query: str) -> str:
     """Get insights about an industry. Args: query (industry name or sector)"""
     try:
-        response = tavily_client.search(
+        response = await tavily_client.search(
             query=f"industry insights {query}",
             include_answer=True,
             search_depth="advanced"
@@ -65,10 +66,10 @@ def get_industry_insights(query: str) -> str:
 
 
 @server.tool()
-def search_career_paths(query: str) -> str:
+async def search_career_paths(query: str) -> str:
     """Search for career paths and advancement. Args: query (current role, field, or starting point)"""
     try:
-        response = tavily_client.search(
+        response = await tavily_client.search(
             query=f"career paths {query}",
             include_answer=True,
             search_depth="advanced"
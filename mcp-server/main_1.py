@@ -1,37 +1,498 @@
 # career_search_mcp.py
 from fastmcp import FastMCP
 from fastmcp.exceptions import ToolError
-from tavily import TavilyClient
+from fastmcp.server.dependencies import get_http_headers
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from typing import Dict, Any
-from logger_utils import get_logger
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from typing_extensions import NotRequired, TypedDict
+from logger_utils import get_logger, log_payload
+from cache_warmer import CacheWarmer
+from company_entities import CompanyResolver
+from disk_cache import DiskCache
+from docs_index import build_docs_index, confident_hits, select_passages
+from metrics import FALLBACKS_SERVED, REGISTRY, SEARCH_TIERS, instrument_tool, render_metrics
+from rate_limit import BACKGROUND, request_priority
+from resilience import ResilientUpstream, UpstreamPolicy, load_policies, within_deadline
+from search_cache import TTLCache, make_cache_key
+from singleflight import SingleFlight
+from tavily_async import create_tavily_client
 
 load_dotenv()
 
+# ──────────────────────────────────────────────────────────────
+# Tavily client (fail fast if key missing)
+# Async + pooled: a slow search no longer holds a thread or the event loop,
+# and TAVILY_MAX_CONCURRENCY bounds how many searches run at once
+# ──────────────────────────────────────────────────────────────
+tavily_api_key = os.getenv("TAVILY_API_KEY")
+if not tavily_api_key:
+    raise ValueError("TAVILY_API_KEY not found in .env")
+
+tavily = create_tavily_client(tavily_api_key)
+
+
+@asynccontextmanager
+async def lifespan(_server: FastMCP):
+    """
+    Prunes the on-disk cache and starts the cache warmer at start-up; stops it
+    and releases pooled connections / files on shutdown.
+    """
+    if disk_cache is not None:
+        await asyncio.to_thread(disk_cache.purge_expired)
+    warm_task = asyncio.create_task(warmer.run_forever()) if WARM_ENABLED else None
+    try:
+        yield
+    finally:
+        if warm_task is not None:
+            warm_task.cancel()
+        await tavily.aclose()
+        if disk_cache is not None:
+            disk_cache.close()
+
+
 # ──────────────────────────────────────────────────────────────
 # Initialise MCP server (name shows up nicely in Rasa logs)
 # ──────────────────────────────────────────────────────────────
 server = FastMCP(
     name="UK Career Advisor Search Tools",
-    mask_error_details=False
+    mask_error_details=False,
+    lifespan=lifespan
     )
 
+
 # ──────────────────────────────────────────────────────────────
-# Tavily client (fail fast if key missing)
+# Result cache — identical searches are answered from memory
 # ──────────────────────────────────────────────────────────────
-tavily_api_key = os.getenv("TAVILY_API_KEY")
-if not tavily_api_key:
-    raise ValueError("TAVILY_API_KEY not found in .env")
+# Seconds a result stays fresh, per tool (career data moves faster than campus pages)
+TOOL_CACHE_TTLS = {
+    "search_uk_career_info": float(os.getenv("CAREER_CACHE_TTL", 6 * 3600)),
+    "extract_wlv_campus_info": float(os.getenv("CAMPUS_CACHE_TTL", 24 * 3600)),
+    # Employer facts change slowly: keep them for days, renewed in the background (TOOL_REFRESH_AFTER)
+    "get_uk_company_info": float(os.getenv("COMPANY_CACHE_TTL", 7 * 24 * 3600)),
+}
+# Age in seconds after which a cache hit also triggers a background refresh, per tool
+TOOL_REFRESH_AFTER = {
+    "get_uk_company_info": float(os.getenv("COMPANY_REFRESH_AFTER", 24 * 3600)),
+}
+
+search_cache = TTLCache(max_entries=int(os.getenv("MCP_CACHE_MAX_ENTRIES", 1024)))
+
+# Optional on-disk tier shared by all server processes; survives restarts.
+# Entries past their TTL are still served for MCP_CACHE_STALE_TTL seconds
+# while a background refresh fetches a new copy (stale-while-revalidate).
+disk_cache_path = os.getenv("MCP_CACHE_DB")
+disk_cache = (
+    DiskCache(disk_cache_path, stale_ttl=float(os.getenv("MCP_CACHE_STALE_TTL", 24 * 3600)))
+    if disk_cache_path else None
+)
 
-tavily = TavilyClient(api_key=tavily_api_key)
+# Identical calls that arrive while one is already running share its upstream request
+inflight = SingleFlight()
+
+# Strong references to background refreshes so they are not garbage-collected mid-flight
+_background_tasks = set()
+
+
+# ──────────────────────────────────────────────────────────────
+# Upstream resilience — bounded tail latency when Tavily degrades
+# Per-tool timeout, circuit breaker and hedging; override any field with
+# UPSTREAM_POLICIES='{"<tool>": {"timeout": 8, "hedge_quantile": null}}'
+# ──────────────────────────────────────────────────────────────
+UPSTREAM_POLICIES = load_policies({
+    # Each career search tier has its own timeout, hedge and latency window,
+    # so a slow basic search never eats into (or re-runs) the advanced one
+    "search_uk_career_info:basic": UpstreamPolicy(timeout=8.0, hedge_quantile=0.95),
+    "search_uk_career_info:advanced": UpstreamPolicy(timeout=15.0, hedge_quantile=0.95),
+    "extract_wlv_campus_info": UpstreamPolicy(timeout=8.0, hedge_quantile=0.9),
+    # Company lookups are the most expensive Tavily calls; don't double them up
+    "get_uk_company_info": UpstreamPolicy(timeout=15.0, hedge_quantile=None),
+})
+upstreams = {tool: ResilientUpstream(tool, policy) for tool, policy in UPSTREAM_POLICIES.items()}
+
+
+def _guarded(tool: str, fetch: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+    """
+    Runs `fetch` under the tool's upstream policy. Tools with several
+    upstream tiers ("<tool>:<tier>" policies) guard each tier inside `fetch`.
+    """
+    upstream = upstreams.get(tool)
+    return upstream.call(fetch) if upstream is not None else fetch()
+
+
+def _serves_stale(tool: str) -> bool:
+    """Whether failures of the tool (or of all its tiers' policies) may be answered from `last_good`."""
+    return all(u.policy.serve_stale for name, u in upstreams.items() if name.split(":")[0] == tool)
+
+# Last successful result per call, kept well past its TTL; answered when the
+# upstream fails or its circuit is open (policy.serve_stale)
+last_good = TTLCache(
+    max_entries=int(os.getenv("MCP_CACHE_MAX_ENTRIES", 1024)),
+    default_ttl=float(os.getenv("MCP_LAST_GOOD_TTL", 7 * 24 * 3600)),
+)
+
+# Callers propagate their remaining time budget in milliseconds with this header
+DEADLINE_HEADER = "x-deadline-ms"
+# Budget for callers that send none (seconds; unset = bounded by the policy timeout only)
+MCP_DEFAULT_DEADLINE = float(os.getenv("MCP_DEFAULT_DEADLINE")) if os.getenv("MCP_DEFAULT_DEADLINE") else None
+
+
+def _caller_budget() -> Optional[float]:
+    """Seconds the current caller is willing to wait, from its deadline header."""
+    value = get_http_headers().get(DEADLINE_HEADER)
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            get_logger("resilience").warning("Ignoring malformed %s header: %r", DEADLINE_HEADER, value)
+    return MCP_DEFAULT_DEADLINE
+
+
+async def cached_call(tool: str, cache_key, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Answers a tool call from the cache, or runs `fetch` once for all concurrent
+    identical callers and caches its result.
+
+    The fetch runs under the tool's upstream policy; the caller stops waiting
+    once its deadline passes, and gets the last good result instead of an
+    error when one is available.
+
+    Args:
+        tool (str): Tool name, selects the TTL in TOOL_CACHE_TTLS and the policies in UPSTREAM_POLICIES.
+        cache_key: Key built with `make_cache_key`.
+        fetch: Zero-argument coroutine function that performs the upstream call.
+
+    Returns:
+        The cached or freshly fetched tool output.
+    """
+    ttl = TOOL_CACHE_TTLS[tool]
+    refresh_after = TOOL_REFRESH_AFTER.get(tool)
+
+    async def _fetch_and_store() -> Any:
+        output = await _guarded(tool, fetch)
+        await _store(tool, cache_key, output)
+        return output
+
+    cached = search_cache.get_with_ttl(cache_key)
+    if cached is not None:
+        output, remaining = cached
+        # Refresh-ahead: long-lived entries are renewed in the background once they are old enough
+        if refresh_after is not None and ttl - remaining > refresh_after:
+            _refresh_in_background(tool, cache_key, _fetch_and_store)
+        return output
+
+    if disk_cache is not None:
+        entry = await asyncio.to_thread(disk_cache.get, cache_key)
+        if entry is not None:
+            output, expires_at = entry
+            remaining = expires_at - time.time()
+            if remaining > 0:
+                search_cache.set(cache_key, output, ttl=min(ttl, remaining))
+            if remaining <= 0 or (refresh_after is not None and ttl - remaining > refresh_after):
+                _refresh_in_background(tool, cache_key, _fetch_and_store)
+            return output
+
+    try:
+        return await within_deadline(tool, inflight.do(cache_key, _fetch_and_store), _caller_budget())
+    except Exception as e:
+        fallback = last_good.get(cache_key) if _serves_stale(tool) else None
+        if fallback is None:
+            raise
+        FALLBACKS_SERVED.inc(tool=tool, reason=type(e).__name__)
+        get_logger(tool).warning("Upstream call failed (%s: %s), serving last good result", type(e).__name__, e)
+        return fallback
+
+
+def _log_tool_call(tool: str, **params: Any) -> None:
+    """One structured record per requested call; cache_warmer mines these for popular queries."""
+    get_logger(tool).info("%s called with %s", tool, params, extra={"fields": {"event": "tool_call", **params}})
+
+
+async def _store(tool: str, cache_key, output: Any) -> None:
+    """Writes a fresh result to every cache tier."""
+    ttl = TOOL_CACHE_TTLS[tool]
+    search_cache.set(cache_key, output, ttl=ttl)
+    last_good.set(cache_key, output)
+    if disk_cache is not None:
+        await asyncio.to_thread(disk_cache.set, cache_key, output, ttl)
+
+
+def _refresh_in_background(tool: str, cache_key, fetch_and_store: Callable[[], Awaitable[Any]]) -> None:
+    """Re-fetches a stale entry without making the current caller wait for it."""
+    async def _refresh() -> None:
+        # Queue behind interactive tool calls for rate-limit tokens
+        request_priority.set(BACKGROUND)
+        try:
+            await inflight.do(cache_key, fetch_and_store)
+        except Exception as e:
+            get_logger(tool).warning("Background refresh failed, keeping stale entry: %s", e)
+
+    task = asyncio.create_task(_refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+# ──────────────────────────────────────────────────────────────
+# Tiered career search — a fast "basic" search first, "advanced" only when
+# the basic result looks thin (CAREER_SEARCH_MODE=advanced restores the old behaviour)
+# ──────────────────────────────────────────────────────────────
+CAREER_SEARCH_MODE = os.getenv("CAREER_SEARCH_MODE", "adaptive").lower()  # adaptive | basic | advanced
+if CAREER_SEARCH_MODE not in ("adaptive", "basic", "advanced"):
+    raise ValueError(f"CAREER_SEARCH_MODE must be adaptive, basic or advanced, not {CAREER_SEARCH_MODE!r}")
+CAREER_MIN_RESULTS = int(os.getenv("CAREER_MIN_RESULTS", 4))
+# Mean relevance score (0-1) of the top 3 basic results
+CAREER_MIN_SCORE = float(os.getenv("CAREER_MIN_SCORE", 0.5))
+CAREER_MIN_ANSWER_CHARS = int(os.getenv("CAREER_MIN_ANSWER_CHARS", 80))
+
+
+def _basic_search_quality(response: Dict[str, Any]) -> Tuple[bool, str, Dict[str, Any]]:
+    """
+    Judges whether a basic-depth response is good enough to return as is.
+
+    Returns:
+        (ok, reason, signals): `reason` names the first failed check ("ok" otherwise).
+    """
+    results = response.get("results", [])
+    top_scores = sorted((r.get("score") or 0.0 for r in results), reverse=True)[:3]
+    signals = {
+        "basic_answer_chars": len(response.get("answer") or ""),
+        "basic_results": len(results),
+        "basic_top_score": round(sum(top_scores) / len(top_scores), 3) if top_scores else 0.0,
+    }
+    if signals["basic_answer_chars"] < CAREER_MIN_ANSWER_CHARS:
+        return False, "no_answer", signals
+    if signals["basic_results"] < CAREER_MIN_RESULTS:
+        return False, "few_results", signals
+    if signals["basic_top_score"] < CAREER_MIN_SCORE:
+        return False, "low_score", signals
+    return True, "ok", signals
+
+
+async def _search_career(query: str, focus: str) -> Dict[str, Any]:
+    # Force UK focus + higher quality
+    # enhanced_query = f"UK {focus} {query} site:prospects.ac.uk OR site:targetjobs.co.uk OR site:gradcracker.com OR site:gov.uk 2025 OR 2026"
+    enhanced_query = f"UK {focus} {query} 2025 OR 2026"
+    logger = get_logger("search_uk_career_info")
+
+    def search(depth: str) -> Awaitable[Dict[str, Any]]:
+        # One upstream call per tier: separate timeout, hedge, breaker and latency window
+        return upstreams[f"search_uk_career_info:{depth}"].call(lambda: tavily.search(
+            query=enhanced_query,
+            search_depth=depth,
+            include_answer=True,
+            include_raw_content=False,
+            max_results=8
+        ))
+
+    tier, reason, signals = CAREER_SEARCH_MODE, "configured", {}
+    response = None
+    if CAREER_SEARCH_MODE != "advanced":
+        response = await search("basic")
+        if CAREER_SEARCH_MODE == "adaptive":
+            ok, reason, signals = _basic_search_quality(response)
+            tier = "basic" if ok else "advanced"
+
+    if tier == "advanced":
+        try:
+            response = await search("advanced")
+        except Exception as e:
+            if response is None:
+                raise
+            # The thin basic result beats an error
+            logger.warning("Advanced career search failed (%s: %s), keeping the basic result", type(e).__name__, e)
+            tier, reason = "basic", "advanced_failed"
+
+    SEARCH_TIERS.inc(tool="search_uk_career_info", tier=tier, reason=reason)
+
+    # Structured output = easy for Gemini to parse in ReAct loop
+    output = {
+        "summary": response.get("answer", "No direct summary available."),
+        "key_facts": [
+            f"{r['title']} → {r['url']}"
+            for r in response.get("results", [])[:6]
+        ],
+        "follow_up_questions": response.get("follow_up_questions", []),
+        "raw_results_count": len(response.get("results", []))
+    }
+    logger.info("UK career search for query '%s' returned %d results (%s depth, %s)",
+                enhanced_query, output["raw_results_count"], tier, reason,
+                extra={"fields": {"query": query, "focus": focus, "tier": tier, "reason": reason, **signals}})
+    log_payload(logger, "UK career search output", query=enhanced_query, output=output)
+    return output
+
+
+# ──────────────────────────────────────────────────────────────
+# Local-first campus lookups — BM25 index over docs/, built once per process;
+# queries the documents clearly answer never reach Tavily
+# ──────────────────────────────────────────────────────────────
+# Confidence gate, calibrated on fixtures/local_docs/labelled_queries.json (`python docs_index.py --check`)
+LOCAL_DOCS_MIN_SCORE = float(os.getenv("LOCAL_DOCS_MIN_SCORE", 4.0))
+# Share of the query's terms the best passage must contain
+LOCAL_DOCS_MIN_COVERAGE = float(os.getenv("LOCAL_DOCS_MIN_COVERAGE", 0.75))
+# Share of the query's terms the best document's title must share
+LOCAL_DOCS_MIN_TITLE_COVERAGE = float(os.getenv("LOCAL_DOCS_MIN_TITLE_COVERAGE", 0.5))
+# How much the best passage must outscore the best one of any other document
+LOCAL_DOCS_MIN_MARGIN = float(os.getenv("LOCAL_DOCS_MIN_MARGIN", 1.1))
+# Default passage count / token budget of extract_wlv_campus_info replies
+CAMPUS_TOP_K = int(os.getenv("CAMPUS_TOP_K", 5))
+CAMPUS_MAX_TOKENS = int(os.getenv("CAMPUS_MAX_TOKENS", 1000))
+# Accepted per-call range of top_k, and the smallest token budget that still fits a useful passage
+CAMPUS_TOP_K_LIMIT = 10
+CAMPUS_MIN_TOKENS = 50
+
+docs_index = None
+if os.getenv("LOCAL_DOCS_ENABLED", "true").lower() == "true":
+    try:
+        docs_index = build_docs_index()
+    except OSError as e:
+        get_logger("extract_wlv_campus_info").warning("Local docs index disabled: %s", e)
+
+
+def _local_campus_pages(query: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Local passages when one university document clearly answers the query
+    (see `confident_hits`), otherwise None.
+
+    Returns:
+        list: {"title", "url", "content"} pages; `url` is None because the
+        documents are internal copies, not pages with a known address.
+    """
+    if docs_index is None:
+        return None
+
+    hits = confident_hits(
+        docs_index, query,
+        min_score=LOCAL_DOCS_MIN_SCORE,
+        min_coverage=LOCAL_DOCS_MIN_COVERAGE,
+        min_title_coverage=LOCAL_DOCS_MIN_TITLE_COVERAGE,
+        min_margin=LOCAL_DOCS_MIN_MARGIN,
+    )
+    if hits is None:
+        return None
+
+    logger = get_logger("extract_wlv_campus_info")
+    logger.info("Answered '%s' from %d local passages (best score %s)", query, len(hits), hits[0]["score"])
+    return [{"title": f"University document: {h['title']}", "url": None, "content": h["text"]} for h in hits]
+
+
+async def _fetch_campus_pages(query: str) -> List[Dict[str, Any]]:
+    # Force search within wlv.ac.uk domain
+    enhanced_query = f"site:wlv.ac.uk {query}"
+
+    # Only the extracted `content` is used, so raw page content is not requested
+    response = await tavily.search(
+        query=enhanced_query,
+        search_depth="basic",
+        include_domains=["wlv.ac.uk"],
+        include_raw_content=False,
+        max_results=5
+    )
+
+    results = response.get("results", [])
+    pages = [
+        {
+            "title": r["title"],
+            "url": r["url"],
+            "content": r.get("content", "")
+        }
+        for r in results if r.get("content")
+    ]
+
+    logger = get_logger("extract_wlv_campus_info")
+    logger.info("Extracted %d pages from wlv.ac.uk for query '%s'", len(pages), query,
+                extra={"fields": {"query": query, "titles": [page["title"] for page in pages]}})
+    return pages
+
+
+def _campus_output(query: str, pages: List[Dict[str, Any]], source: str, top_k: int, max_tokens: int) -> Dict[str, Any]:
+    """Keeps only the passages most relevant to the query that fit the token budget."""
+    passages = select_passages(query, pages, top_k=top_k, max_tokens=max_tokens)
+    origin = "university documents" if source == "local_docs" else "Wolverhampton University web pages"
+
+    # Structured output for easy accessibility
+    output = {
+        "summary": f"Selected {len(passages)} relevant passages from {len(pages)} {origin} for '{query}'.",
+        "key_facts": list(dict.fromkeys(f"{p['title']} → {p['url']}" if p["url"] else p["title"] for p in passages)),
+        "extracted_content": passages,  # Most relevant passages for RAG, with their URLs
+        "total_extracted": len(passages),
+        "source": source
+    }
+    logger = get_logger("extract_wlv_campus_info")
+    logger.info("Sending %d passages (%s) to Rasa for '%s'", len(passages), source, query)
+    log_payload(logger, "Output sent to Rasa", query=query, output=output)
+    return output
+
+
+# ──────────────────────────────────────────────────────────────
+# Company entities — "PwC", "PricewaterhouseCoopers UK" and "pwc uk" share
+# one cache entry; records are compact and kept for days
+# ──────────────────────────────────────────────────────────────
+company_resolver = CompanyResolver.from_file(fuzzy_cutoff=float(os.getenv("COMPANY_FUZZY_CUTOFF", 0.92)))
+COMPANY_MAX_SOURCES = int(os.getenv("COMPANY_MAX_SOURCES", 3))
+COMPANY_SNIPPET_CHARS = int(os.getenv("COMPANY_SNIPPET_CHARS", 300))
+
+
+def _snippet(text: str, limit: int) -> str:
+    """Whitespace-collapsed text cut at a word boundary."""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+async def _company_info(company_name: str) -> Dict[str, Any]:
+    # Enhance query with UK focus
+    enhanced_query = f"{company_name} UK"
+
+    response = await tavily.get_company_info(
+        query=enhanced_query,
+        max_results=5,
+        country="united kingdom"
+    )
+
+    # Response is a list of dicts with url, title, content, score (best first).
+    # Keep a few distinct sources with short snippets instead of the full page text.
+    sources, seen_urls, seen_snippets = [], set(), set()
+    for item in response:
+        url = item.get("url", "N/A")
+        snippet = _snippet(item.get("content", ""), COMPANY_SNIPPET_CHARS)
+        if url in seen_urls or snippet.lower()[:120] in seen_snippets:
+            continue
+        seen_urls.add(url)
+        seen_snippets.add(snippet.lower()[:120])
+        sources.append({
+            "title": item.get("title", "N/A"),
+            "url": url,
+            "snippet": snippet,
+            "score": round(item["score"], 3) if isinstance(item.get("score"), (int, float)) else None,
+        })
+        if len(sources) >= COMPANY_MAX_SOURCES:
+            break
+
+    # Structured output for easy accessibility
+    output = {
+        "company": company_name,
+        "summary": f"Top {len(sources)} UK sources on {company_name} from Tavily company search.",
+        "key_facts": [f"{source['title']} → {source['url']}" for source in sources],
+        "sources": sources,
+    }
+
+    logger = get_logger("get_uk_company_info")
+    logger.info("Structured UK company info for '%s': %d results, %d kept", enhanced_query, len(response), len(sources))
+    return output
 
 
 # ──────────────────────────────────────────────────────────────
 # Core tool — ONE powerful, flexible tool beats four narrow ones
 # ──────────────────────────────────────────────────────────────
 @server.tool()
-def search_uk_career_info(
+@instrument_tool("search_uk_career_info")
+async def search_uk_career_info(
     query: str,
     focus: str = "general"  # general | salary | trends | deadlines | companies | visas
 ) -> Dict[str, Any]:
@@ -44,82 +505,135 @@ def search_uk_career_info(
         focus: Helps prioritise results → salary | trends | deadlines | companies | visas | pathways
     """
     try:
-        # Force UK focus + higher quality
-        # enhanced_query = f"UK {focus} {query} site:prospects.ac.uk OR site:targetjobs.co.uk OR site:gradcracker.com OR site:gov.uk 2025 OR 2026"
-        enhanced_query = f"UK {focus} {query} 2025 OR 2026"
-
-        response = tavily.search(
-            query=enhanced_query,
-            search_depth="advanced",
-            include_answer=True,
-            include_raw_content=False,
-            max_results=8
+        _log_tool_call("search_uk_career_info", query=query, focus=focus)
+        cache_key = make_cache_key("search_uk_career_info", query=query, focus=focus)
+        return await cached_call(
+            "search_uk_career_info", cache_key, lambda: _search_career(query, focus)
         )
 
-        # Structured output = easy for Gemini to parse in ReAct loop
-        output = {
-            "summary": response.get("answer", "No direct summary available."),
-            "key_facts": [
-                f"{r['title']} → {r['url']}"
-                for r in response.get("results", [])[:6]
-            ],
-            "follow_up_questions": response.get("follow_up_questions", []),
-            "raw_results_count": len(response.get("results", []))
-        }
-        logger = get_logger("search_uk_career_info")
-        logger.info(f"UK career search results for query '{enhanced_query}': {output}\n")
-        return output
-
     except Exception as e:
         raise ToolError(f"Tavily search failed: {str(e)}")
 
 
+# ──────────────────────────────────────────────────────────────
+# Batch variant — several (query, focus) searches in ONE ReAct step
+# ──────────────────────────────────────────────────────────────
+class CareerSearch(TypedDict):
+    query: str
+    focus: NotRequired[str]
+
+
+MAX_BATCH_SEARCHES = int(os.getenv("MAX_BATCH_SEARCHES", 6))
+
+
+@server.tool()
+@instrument_tool("search_uk_career_info_batch")
+async def search_uk_career_info_batch(searches: List[CareerSearch]) -> Dict[str, Any]:
+    """
+    Run several UK career searches at once and get one merged, de-duplicated result.
+    Prefer this over repeated search_uk_career_info calls when you need different
+    kinds of information (e.g. salary, trends and visas) for the same role.
+
+    Args:
+        searches: List of {"query": ..., "focus": ...} items (up to 6), e.g.
+            [{"query": "data analyst", "focus": "salary"}, {"query": "data analyst", "focus": "visas"}]
+            focus → general | salary | trends | deadlines | companies | visas | pathways
+    """
+    if not searches:
+        raise ToolError("Provide at least one search.")
+    if len(searches) > MAX_BATCH_SEARCHES:
+        raise ToolError(f"At most {MAX_BATCH_SEARCHES} searches per batch.")
+
+    # Drop duplicate sub-queries before fanning out
+    unique = {}
+    for item in searches:
+        focus = item.get("focus") or "general"
+        unique.setdefault(make_cache_key("search_uk_career_info", query=item["query"], focus=focus),
+                          (item["query"], focus))
+    for query, focus in unique.values():
+        _log_tool_call("search_uk_career_info", query=query, focus=focus)
+
+    results = await asyncio.gather(
+        *[
+            cached_call("search_uk_career_info", cache_key, lambda q=query, f=focus: _search_career(q, f))
+            for cache_key, (query, focus) in unique.items()
+        ],
+        return_exceptions=True
+    )
+
+    summaries, key_facts, follow_ups, failed = [], [], [], []
+    seen_urls, seen_questions = set(), set()
+    raw_results_count = 0
+    for (query, focus), result in zip(unique.values(), results):
+        if isinstance(result, BaseException):
+            failed.append({"query": query, "focus": focus, "error": str(result)})
+            continue
+
+        summaries.append({"query": query, "focus": focus, "summary": result["summary"]})
+        raw_results_count += result["raw_results_count"]
+        for fact in result["key_facts"]:
+            url = fact.rsplit(" → ", 1)[-1]
+            if url not in seen_urls:
+                seen_urls.add(url)
+                key_facts.append(fact)
+        for question in result["follow_up_questions"] or []:
+            if question.lower() not in seen_questions:
+                seen_questions.add(question.lower())
+                follow_ups.append(question)
+
+    if not summaries:
+        raise ToolError(f"Tavily search failed for every query: {failed}")
+
+    output = {
+        "summaries": summaries,
+        "key_facts": key_facts,
+        "follow_up_questions": follow_ups,
+        "raw_results_count": raw_results_count,
+        "failed_searches": failed
+    }
+    logger = get_logger("search_uk_career_info_batch")
+    logger.info("Batch career search: %d queries, %d failed", len(unique), len(failed),
+                extra={"fields": {"queries": [s["query"] for s in summaries]}})
+    return output
+
+
 # ──────────────────────────────────────────────────────────────
 # Tool for Wolverhampton University content extraction (RAG support)
 # ──────────────────────────────────────────────────────────────
 @server.tool()
-def extract_wlv_campus_info(query: str) -> Dict[str, Any]:
+@instrument_tool("extract_wlv_campus_info")
+async def extract_wlv_campus_info(
+    query: str,
+    top_k: int = CAMPUS_TOP_K,
+    max_tokens: int = CAMPUS_MAX_TOKENS
+) -> Dict[str, Any]:
     """
     Extract web content from University of Wolverhampton website (wlv.ac.uk).
     Specialized for school/campus information to support RAG responses.
+    Topics the university's own documents clearly cover are answered from them without a web search.
 
     Args:
         query: Specific topic or search within the wlv.ac.uk site (e.g., "student life", "academic support")
+        top_k: Maximum number of passages to return (1-10)
+        max_tokens: Approximate token budget for all returned passages together (at least 50)
     """
+    if not 1 <= top_k <= CAMPUS_TOP_K_LIMIT:
+        raise ToolError(f"top_k must be between 1 and {CAMPUS_TOP_K_LIMIT}, got {top_k}.")
+    if max_tokens < CAMPUS_MIN_TOKENS:
+        raise ToolError(f"max_tokens must be at least {CAMPUS_MIN_TOKENS}, got {max_tokens}.")
+
     try:
-        # Force search within wlv.ac.uk domain
-        enhanced_query = f"site:wlv.ac.uk {query}"
+        _log_tool_call("extract_wlv_campus_info", query=query)
+        local_pages = _local_campus_pages(query)
+        if local_pages is not None:
+            return _campus_output(query, local_pages, "local_docs", top_k, max_tokens)
 
-        response = tavily.search(
-            query=enhanced_query,
-            search_depth="basic",
-            include_domains=["wlv.ac.uk"],
-            include_raw_content=True,  # Get full content for RAG
-            max_results=5
+        # Pages are cached as fetched; passage selection runs per call
+        cache_key = make_cache_key("extract_wlv_campus_info", query=query)
+        pages = await cached_call(
+            "extract_wlv_campus_info", cache_key, lambda: _fetch_campus_pages(query)
         )
-
-        results = response.get("results", [])
-        extracted_content = [
-            {
-                "title": r["title"],
-                "url": r["url"],
-                "content": r.get("content", "")
-            }
-            for r in results if r.get("content")
-        ]
-
-        logger = get_logger("extract_wlv_campus_info")
-        logger.info(f"Extracted {len(extracted_content)} pages from wlv.ac.uk for query '{query}': {[page['title'] for page in extracted_content]}\n")
-        
-        # Structured output for easy accessibility
-        output = {
-            "summary": f"Extracted {len(extracted_content)} pages of content from Wolverhampton University website for '{query}'.",
-            "key_facts": [f"{p['title']} → {p['url']}" for p in extracted_content],
-            "extracted_content": extracted_content,  # Full content for RAG
-            "total_extracted": len(extracted_content)
-        }
-        logger.info(f"Output sent to Rasa: \n \t{output} \n")
-        return output
+        return _campus_output(query, pages, "web", top_k, max_tokens)
 
     except Exception as e:
         raise ToolError(f"WLV content extraction failed: {str(e)}")
@@ -129,51 +643,75 @@ def extract_wlv_campus_info(query: str) -> Dict[str, Any]:
 # Tool for UK company information retrieval
 # ──────────────────────────────────────────────────────────────
 @server.tool()
-def get_uk_company_info(company_name: str) -> Any:
+@instrument_tool("get_uk_company_info")
+async def get_uk_company_info(company_name: str) -> Any:
     """
     Retrieve detailed company information using Tavily's company info API.
     Focused on UK-based companies for career and job market insights.
+    Different spellings of the same employer (e.g. "PwC", "PricewaterhouseCoopers") return the same record.
 
     Args:
         company_name: Name of the UK company to retrieve information about
     """
     try:
-        # Enhance query with UK focus
-        enhanced_query = f"{company_name} UK"
-
-        response = tavily.get_company_info(
-            query=enhanced_query,
-            max_results=5,
-            country="united kingdom"
+        entity, display_name, match = company_resolver.resolve(company_name)
+        get_logger("get_uk_company_info").info("Resolved company '%s' to '%s' (%s)", company_name, display_name, match)
+        cache_key = make_cache_key("get_uk_company_info", company=entity)
+        return await cached_call(
+            "get_uk_company_info", cache_key, lambda: _company_info(display_name)
         )
 
-        # Structured output for easy accessibility
-        # Response is a list of dicts with url, title, content, score
-        summary = "Company information retrieved from Tavily API."
-        key_facts = []
-        companies = response[:3]  # Top 3 results
-        for i, item in enumerate(companies):
-            key_facts.append(f"Result {i+1} Title: {item.get('title', 'N/A')}")
-            key_facts.append(f"URL: {item.get('url', 'N/A')}")
-            # key_facts.append(f"Content summary: {item.get('content', '')[:100]}...")
-            key_facts.append(f"Content summary: {item.get('content', '')}...")
-            key_facts.append(f"Score: {item.get('score', 'N/A')}")
-        key_facts.append("These are the Top 3 results")
-
-        output = {
-            "summary": summary,
-            "key_facts": key_facts,
-            "full_company_info": response
-        }
-
-        logger = get_logger("get_uk_company_info")
-        logger.info(f"Structured UK company info for '{enhanced_query}': Summary - {summary}\n")
-        return output
-
     except Exception as e:
         raise ToolError(f"UK company info retrieval failed: {str(e)}")
 
 
+# ──────────────────────────────────────────────────────────────
+# Cache warm-up — popular queries (warm_queries.json + mined from logs)
+# are fetched at boot and again off-peak into the regular cache tiers
+# ──────────────────────────────────────────────────────────────
+WARM_ENABLED = os.getenv("WARM_ENABLED", "true").lower() == "true"
+# A disk entry stored this recently (e.g. by another worker's warm-up) is not fetched again
+WARM_REUSE_AGE = float(os.getenv("WARM_REUSE_AGE", 3600))
+# Only the worker holding this lock warms (one warm-up per disk cache, not one per worker)
+WARM_LOCK_FILE = os.getenv("WARM_LOCK_FILE") or (f"{disk_cache_path}.warm.lock" if disk_cache_path else None)
+
+
+async def _warm(tool: str, params: Dict[str, Any]) -> None:
+    """
+    Fetches one popular call into the caches. Warmed results follow the
+    tool's TTL and stale-while-revalidate path like any other fetch.
+    """
+    query = params["query"]
+    if tool == "search_uk_career_info":
+        focus = params.get("focus") or "general"
+        cache_key = make_cache_key(tool, query=query, focus=focus)
+        fetch = lambda: _search_career(query, focus)
+    else:
+        if _local_campus_pages(query) is not None:
+            return  # answered from the local docs index anyway
+        cache_key = make_cache_key(tool, query=query)
+        fetch = lambda: _fetch_campus_pages(query)
+
+    if disk_cache is not None:
+        entry = await asyncio.to_thread(disk_cache.get, cache_key)
+        if entry is not None and TOOL_CACHE_TTLS[tool] - (entry[1] - time.time()) < WARM_REUSE_AGE:
+            return
+
+    output = await inflight.do(cache_key, lambda: _guarded(tool, fetch))
+    await _store(tool, cache_key, output)
+
+
+warmer = CacheWarmer(
+    _warm,
+    refresh_at=os.getenv("WARM_REFRESH_AT", "05:30"),
+    concurrency=int(os.getenv("WARM_CONCURRENCY", 2)),
+    log_pattern=os.getenv("WARM_FROM_LOGS") or None,
+    log_top_n=int(os.getenv("WARM_LOG_TOP_N", 20)),
+    log_hours=float(os.getenv("WARM_LOG_HOURS", 72)),
+    lock_path=WARM_LOCK_FILE,
+)
+
+
 # ──────────────────────────────────────────────────────────────
 # Optional: tiny health-check tool (great for debugging in Rasa inspect)
 # ──────────────────────────────────────────────────────────────
@@ -183,14 +721,95 @@ def ping() -> str:
     return "pong – UK Career Search MCP is ready!"
 
 
+@server.tool()
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the search result cache, last cache warm-up, upstream calls saved by request coalescing and circuit breaker states"""
+    return {
+        **search_cache.stats(),
+        "coalescing": inflight.stats(),
+        "disk": disk_cache.stats() if disk_cache is not None else None,
+        "warm": {"last_run": warmer.last_run},
+        "circuits": {name: upstream.breaker.state for name, upstream in upstreams.items()},
+    }
+
+
+# ──────────────────────────────────────────────────────────────
+# Metrics — Prometheus text format on GET /metrics
+# ──────────────────────────────────────────────────────────────
+def _cache_samples():
+    memory = search_cache.stats()
+    yield ("mcp_cache_hits_total", "counter", "Result cache hits by tier.", {"tier": "memory"}, memory["hits"])
+    yield ("mcp_cache_misses_total", "counter", "Result cache misses by tier.", {"tier": "memory"}, memory["misses"])
+    yield ("mcp_cache_hit_ratio", "gauge", "Share of lookups answered by the tier.", {"tier": "memory"}, memory["hit_ratio"])
+    yield ("mcp_cache_entries", "gauge", "Entries held in the in-memory cache.", {}, memory["entries"])
+    yield ("mcp_cache_evictions_total", "counter", "LRU evictions from the in-memory cache.", {}, memory["evictions"])
+    if disk_cache is not None:
+        disk = disk_cache.stats()
+        lookups = disk["fresh_hits"] + disk["stale_hits"] + disk["misses"]
+        hits = disk["fresh_hits"] + disk["stale_hits"]
+        yield ("mcp_cache_hits_total", "counter", "Result cache hits by tier.", {"tier": "disk"}, hits)
+        yield ("mcp_cache_misses_total", "counter", "Result cache misses by tier.", {"tier": "disk"}, disk["misses"])
+        yield ("mcp_cache_hit_ratio", "gauge", "Share of lookups answered by the tier.", {"tier": "disk"},
+               round(hits / lookups, 4) if lookups else 0.0)
+        yield ("mcp_cache_stale_served_total", "counter", "Stale disk entries served while refreshing.", {}, disk["stale_hits"])
+    coalescing = inflight.stats()
+    yield ("mcp_upstream_calls_total", "counter", "Upstream fetches started after a cache miss.", {}, coalescing["upstream_calls"])
+    yield ("mcp_coalesced_calls_total", "counter", "Calls that shared an identical in-flight fetch.", {}, coalescing["upstream_calls_saved"])
+    yield ("mcp_upstream_in_flight", "gauge", "Distinct upstream fetches currently running.", {}, coalescing["in_flight"])
+
+
+REGISTRY.add_collector(_cache_samples)
+# Each worker keeps its own metrics; label them so series from different workers don't collide
+if int(os.getenv("MCP_WORKERS", 1)) > 1:
+    REGISTRY.const_labels = {"worker": str(os.getpid())}
+
+
+@server.custom_route("/metrics", methods=["GET"])
+async def metrics(_request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ──────────────────────────────────────────────────────────────
 # Run server (use streamable-http for best Rasa Pro compatibility)
 # ──────────────────────────────────────────────────────────────
+MCP_HOST = os.getenv("MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.getenv("MCP_PORT", 8080))
+# Production mode: N worker processes behind one port. Sessions must then be
+# stateless, since consecutive requests of one session can land on different workers.
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", 1))
+# Seconds in-flight tool calls get to finish after SIGTERM/SIGINT
+MCP_GRACEFUL_TIMEOUT = int(os.getenv("MCP_GRACEFUL_TIMEOUT", 30))
+
+
+def create_app():
+    """ASGI app factory, imported by every uvicorn worker process in multi-worker mode."""
+    return server.http_app(path="/mcp", transport="streamable-http", stateless_http=True)
+
+
 if __name__ == "__main__":
     # print("UK Career Search MCP Server starting on http://localhost:8080")
-    server.run(
-        transport="streamable-http",
-        host="127.0.0.1",
-        port=8080,
-        stateless_http=False
-    )
+    if MCP_WORKERS > 1:
+        import uvicorn
+
+        # Workers share warm results through the on-disk cache tier; default it on
+        # (before the workers are spawned, so they inherit it) if none is configured
+        os.environ.setdefault(
+            "MCP_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_cache.db")
+        )
+        uvicorn.run(
+            "main_1:create_app",
+            factory=True,
+            host=MCP_HOST,
+            port=MCP_PORT,
+            workers=MCP_WORKERS,
+            timeout_graceful_shutdown=MCP_GRACEFUL_TIMEOUT,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+        )
+    else:
+        server.run(
+            transport="streamable-http",
+            host=MCP_HOST,
+            port=MCP_PORT,
+            stateless_http=False,
+            uvicorn_config={"timeout_graceful_shutdown": MCP_GRACEFUL_TIMEOUT}
+        )
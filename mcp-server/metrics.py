@@ -0,0 +1,247 @@
+import bisect
+import contextvars
+import functools
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Tool whose call is currently being served; lets upstream timings be attributed to it
+current_tool: contextvars.ContextVar[str] = contextvars.ContextVar("current_tool", default="none")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Dict[str, str]) -> str:
+    pairs = list(extra.items()) + list(zip(names, values))
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, const_labels: Dict[str, str]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self, const_labels: Dict[str, str]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key, const_labels)} {value}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, per label set."""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self, const_labels: Dict[str, str]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key, const_labels)} {value}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket..., +Inf count, sum]
+            state = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def render(self, const_labels: Dict[str, str]) -> List[str]:
+        lines = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames + ("le",), key + (le,), const_labels)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, const_labels)
+            lines.append(f"{self.name}_sum{labels} {state[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Holds metrics plus callbacks that report externally kept counters
+    (cache stats, ...) at scrape time, and renders the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self.const_labels: Dict[str, str] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        """
+        Adds a callback yielding (name, kind, documentation, labels, value) samples.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render(self.const_labels))
+
+        seen = set()
+        for collector in self._collectors:
+            for name, kind, documentation, labels, value in collector():
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()), self.const_labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_CALLS = REGISTRY.register(Counter(
+    "mcp_tool_calls_total", "MCP tool calls by tool and outcome.", ("tool", "outcome")))
+TOOL_ERRORS = REGISTRY.register(Counter(
+    "mcp_tool_errors_total", "Failed MCP tool calls by tool and root error type.", ("tool", "error_type")))
+TOOL_LATENCY = REGISTRY.register(Histogram(
+    "mcp_tool_duration_seconds", "End-to-end MCP tool call latency.", ("tool",)))
+TOOL_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_tool_in_flight", "MCP tool calls currently being served.", ("tool",)))
+TOOL_RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "mcp_tool_response_bytes", "Size of MCP tool responses (JSON-encoded).", ("tool",), buckets=SIZE_BUCKETS))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "mcp_upstream_duration_seconds", "Latency of individual Tavily requests, by calling tool.", ("tool",)))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "mcp_upstream_errors_total", "Failed Tavily requests by calling tool and error type.", ("tool", "error_type")))
+HEDGED_REQUESTS = REGISTRY.register(Counter(
+    "mcp_upstream_hedges_total", "Hedged upstream requests fired, and how many of them won.", ("tool", "outcome")))
+BREAKER_STATE = REGISTRY.register(Gauge(
+    "mcp_circuit_breaker_state", "Upstream circuit breaker state (0 closed, 1 half-open, 2 open).", ("tool",)))
+BREAKER_REJECTIONS = REGISTRY.register(Counter(
+    "mcp_circuit_breaker_rejections_total", "Calls failed fast because the circuit was open.", ("tool",)))
+DEADLINES_EXCEEDED = REGISTRY.register(Counter(
+    "mcp_deadline_exceeded_total", "Tool calls that ran out of their caller's time budget.", ("tool",)))
+SEARCH_TIERS = REGISTRY.register(Counter(
+    "mcp_search_tier_total", "Searches by the Tavily depth that served them and why.", ("tool", "tier", "reason")))
+RATE_LIMIT_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "mcp_rate_limit_queue_depth", "Upstream requests waiting for a rate-limit token, by priority.", ("priority",)))
+RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "mcp_rate_limit_wait_seconds", "Time upstream requests waited for a rate-limit token, by priority.", ("priority",)))
+UPSTREAM_THROTTLED = REGISTRY.register(Counter(
+    "mcp_upstream_throttled_total", "Tavily 429 responses whose request was re-queued, by calling tool.", ("tool",)))
+FALLBACKS_SERVED = REGISTRY.register(Counter(
+    "mcp_fallback_served_total", "Upstream failures answered with the last good result.", ("tool", "reason")))
+
+
+def _root_error(e: BaseException) -> BaseException:
+    # Tools re-raise upstream failures as ToolError; report what actually went wrong
+    return e.__cause__ or e.__context__ or e
+
+
+def instrument_tool(name: str) -> Callable:
+    """
+    Decorator for async MCP tools recording call counts, latency, errors,
+    in-flight calls and response sizes under the tool `name`.
+
+    Apply it below `@server.tool()` so the tool schema is still taken from the
+    wrapped function's signature.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> Any:
+            token = current_tool.set(name)
+            TOOL_IN_FLIGHT.inc(tool=name)
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                TOOL_CALLS.inc(tool=name, outcome="error")
+                TOOL_ERRORS.inc(tool=name, error_type=type(_root_error(e)).__name__)
+                raise
+            else:
+                TOOL_CALLS.inc(tool=name, outcome="ok")
+                TOOL_RESPONSE_BYTES.observe(len(json.dumps(result, default=str)), tool=name)
+                return result
+            finally:
+                TOOL_LATENCY.observe(time.perf_counter() - started, tool=name)
+                TOOL_IN_FLIGHT.dec(tool=name)
+                current_tool.reset(token)
+        return wrapper
+    return decorator
+
+
+class upstream_timer:
+    """
+    Async context manager timing one upstream request and counting its
+    failures, attributed to the tool in `current_tool`.
+    """
+
+    async def __aenter__(self) -> "upstream_timer":
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        tool = current_tool.get()
+        UPSTREAM_LATENCY.observe(time.perf_counter() - self._started, tool=tool)
+        if exc is not None:
+            UPSTREAM_ERRORS.inc(tool=tool, error_type=type(exc).__name__)
+
+
+def render_metrics() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    return REGISTRY.render()
@@ -0,0 +1,170 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+from metrics import RATE_LIMIT_QUEUE_DEPTH, RATE_LIMIT_WAIT
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Priority of the upstream requests made by the current task; background jobs
+# (cache refreshes, warm-up) set BACKGROUND so tool calls from students go first
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+class QueueTime:
+    """
+    Time the requests of one upstream call spend queued for a token.
+
+    While at least one of them waits, the call's asyncio timeout (if any) is
+    suspended and then pushed back by the time spent waiting, so a backlog at
+    the limiter is not mistaken for a slow or failing upstream.
+    """
+
+    def __init__(self, timeout: Optional[asyncio.Timeout] = None):
+        self._timeout = timeout
+        self._waiting = 0
+        self._since = 0.0
+        self._deadline: Optional[float] = None
+        self.seconds = 0.0
+        # Loop time at which the last wait ended
+        self.waited_until: Optional[float] = None
+        self.closed = False
+
+    @property
+    def queued(self) -> bool:
+        """Whether a request of the call is waiting for a token right now."""
+        return self._waiting > 0
+
+    def _reschedule(self, when: Optional[float]) -> None:
+        if self._timeout is not None and not self.closed and not self._timeout.expired():
+            self._timeout.reschedule(when)
+
+    def enter(self) -> None:
+        if self._waiting == 0:
+            self._since = asyncio.get_running_loop().time()
+            self._deadline = self._timeout.when() if self._timeout is not None else None
+            self._reschedule(None)
+        self._waiting += 1
+
+    def exit(self) -> None:
+        self._waiting -= 1
+        if self._waiting == 0:
+            self.waited_until = asyncio.get_running_loop().time()
+            waited = self.waited_until - self._since
+            self.seconds += waited
+            if self._deadline is not None:
+                self._reschedule(self._deadline + waited)
+
+
+# The upstream call the current task's requests belong to (set by ResilientUpstream.call)
+queue_time: contextvars.ContextVar[Optional[QueueTime]] = contextvars.ContextVar("queue_time", default=None)
+
+
+class PriorityRateLimiter:
+    """
+    Token bucket shared by every outbound request of the process.
+
+    Requests that find the bucket empty are queued rather than rejected and
+    served strictly by priority, then arrival order, as tokens refill at
+    `rate` per second. `burst` tokens can be spent back to back.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # (priority, sequence, future) — the sequence keeps FIFO order within a priority
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now > self._paused_until:
+            start = max(self._updated, self._paused_until)
+            self._tokens = min(self.burst, self._tokens + (now - start) * self.rate)
+        self._updated = now
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: Optional[int] = None) -> None:
+        """
+        Waits for a token. Callers of the same priority are served first come,
+        first served; any waiting INTERACTIVE caller goes before BACKGROUND ones.
+        The wait is recorded in the current `queue_time`.
+
+        Args:
+            priority (int): INTERACTIVE or BACKGROUND (default: `request_priority`).
+        """
+        priority = request_priority.get() if priority is None else priority
+        label = PRIORITY_NAMES.get(priority, str(priority))
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            RATE_LIMIT_WAIT.observe(0.0, priority=label)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        RATE_LIMIT_QUEUE_DEPTH.inc(priority=label)
+        started = time.monotonic()
+        self._schedule()
+        waited = queue_time.get()
+        if waited is not None:
+            waited.enter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a token just as we were cancelled: hand it to the next in line
+                self._tokens += 1
+                self._dispatch()
+            raise
+        finally:
+            if waited is not None:
+                waited.exit()
+            RATE_LIMIT_QUEUE_DEPTH.dec(priority=label)
+            RATE_LIMIT_WAIT.observe(time.monotonic() - started, priority=label)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for `seconds`, e.g. after the provider answered
+        429. Queued requests stay queued.
+        """
+        self._refill()
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            return
+        if self._tokens >= 1 and time.monotonic() >= self._paused_until:
+            delay = 0.0
+        else:
+            delay = max(self._paused_until - time.monotonic(), 0.0) + (1 - self._tokens) / self.rate
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0.0), self._dispatch)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # cancelled while waiting
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        # Drop cancelled waiters at the head so an idle limiter doesn't keep a timer running
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters:
+            self._schedule()
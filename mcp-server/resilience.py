@@ -0,0 +1,267 @@
+import asyncio
+import collections
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from tavily.errors import BadRequestError
+
+from metrics import BREAKER_REJECTIONS, BREAKER_STATE, DEADLINES_EXCEEDED, HEDGED_REQUESTS
+from rate_limit import QueueTime, queue_time
+
+# Errors that say nothing about the provider's health (bad input) and don't trip the breaker
+_CLIENT_ERRORS = (BadRequestError,)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call runs out of the time budget its caller gave it."""
+
+
+@dataclass(frozen=True)
+class UpstreamPolicy:
+    """
+    How upstream calls of one tool are bounded.
+
+    Attributes:
+        timeout: Seconds a single upstream fetch (including its hedge) may take,
+            not counting time its requests wait for a rate-limit token.
+        hedge_quantile: Fire a second, identical request once the first has run
+            longer than this latency quantile of recent calls (None disables hedging).
+        hedge_min_delay: Never hedge earlier than this many seconds.
+        hedge_min_samples: Latencies needed before the quantile is trusted.
+        breaker_failures: Consecutive failures that open the circuit.
+        breaker_reset: Seconds the circuit stays open before one probe call is let through.
+        serve_stale: Answer from the last good result when the call fails or the circuit is open.
+    """
+    timeout: float = 15.0
+    hedge_quantile: Optional[float] = 0.95
+    hedge_min_delay: float = 0.5
+    hedge_min_samples: int = 20
+    breaker_failures: int = 5
+    breaker_reset: float = 30.0
+    serve_stale: bool = True
+
+
+def load_policies(defaults: Dict[str, UpstreamPolicy]) -> Dict[str, UpstreamPolicy]:
+    """
+    Applies per-tool overrides from the UPSTREAM_POLICIES environment variable,
+    a JSON object such as `{"get_uk_company_info": {"timeout": 8, "hedge_quantile": null}}`.
+    """
+    overrides = json.loads(os.getenv("UPSTREAM_POLICIES") or "{}")
+    unknown = set(overrides) - set(defaults)
+    if unknown:
+        raise ValueError(f"UPSTREAM_POLICIES names unknown tools: {sorted(unknown)}")
+    return {tool: replace(policy, **overrides.get(tool, {})) for tool, policy in defaults.items()}
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker: closed (calls pass), open (calls fail fast
+    for `reset_timeout` seconds) and half-open (one probe call decides
+    whether to close again or re-open).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._report()
+
+    def _report(self) -> None:
+        BREAKER_STATE.set({self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state], tool=self.name)
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (claims the probe slot when half-open)."""
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._report()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self._report()
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._report()
+
+    def release(self) -> None:
+        """Gives back a probe slot whose call ended without a verdict (cancelled or bad input)."""
+        self._probing = False
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls, for percentile estimates."""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = collections.deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class ResilientUpstream:
+    """
+    Wraps the upstream fetches of one tool with a timeout, a circuit breaker
+    and optional hedging, as configured by its `UpstreamPolicy`.
+    """
+
+    def __init__(self, tool: str, policy: UpstreamPolicy):
+        self.tool = tool
+        self.policy = policy
+        self.breaker = CircuitBreaker(tool, policy.breaker_failures, policy.breaker_reset)
+        self.latencies = LatencyWindow()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.policy.hedge_quantile is None or len(self.latencies) < self.policy.hedge_min_samples:
+            return None
+        return max(self.policy.hedge_min_delay, self.latencies.quantile(self.policy.hedge_quantile))
+
+    async def call(self, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `fetch()` within the policy timeout, hedging it if it is slow.
+        Time spent queued on the rate limiter counts neither toward the timeout
+        nor as latency.
+
+        Raises:
+            CircuitOpenError: The breaker is open; nothing was sent upstream.
+            TimeoutError: No attempt finished within the timeout.
+        """
+        if not self.breaker.allow():
+            BREAKER_REJECTIONS.inc(tool=self.tool)
+            raise CircuitOpenError(f"{self.tool}: upstream circuit open after repeated failures")
+
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(self.policy.timeout) as timeout:
+                waited = QueueTime(timeout)
+                token = queue_time.set(waited)
+                try:
+                    result = await self._hedged(fetch, waited)
+                finally:
+                    waited.closed = True
+                    queue_time.reset(token)
+        except _CLIENT_ERRORS:
+            self.breaker.release()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.latencies.observe(time.monotonic() - started - waited.seconds)
+        return result
+
+    async def _hedged(self, fetch: Callable[[], Awaitable[Any]], waited: QueueTime) -> Any:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await fetch()
+
+        first = asyncio.ensure_future(fetch())
+        attempts = {first}
+        try:
+            # The delay runs from when the primary got its rate-limit token: while it
+            # is queued it isn't slow, and a hedge would only queue behind it
+            loop = asyncio.get_running_loop()
+            sent_at, done = loop.time(), set()
+            while not done:
+                if waited.queued:
+                    remaining = delay
+                else:
+                    remaining = delay - (loop.time() - max(sent_at, waited.waited_until or sent_at))
+                    if remaining <= 0:
+                        break
+                done, _ = await asyncio.wait(attempts, timeout=remaining)
+            if not done:
+                HEDGED_REQUESTS.inc(tool=self.tool, outcome="fired")
+                attempts.add(asyncio.ensure_future(fetch()))
+
+            # First successful attempt wins; an error only counts once every attempt has failed
+            error: Optional[BaseException] = None
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            HEDGED_REQUESTS.inc(tool=self.tool, outcome="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark a losing attempt's error as retrieved
+                    task.exception()
+
+
+# Fetches that outlived their caller's deadline keep running to fill the cache
+_detached: Set[asyncio.Task] = set()
+
+
+def _consume_result(task: asyncio.Task) -> None:
+    _detached.discard(task)
+    if not task.cancelled():
+        task.exception()
+
+
+async def within_deadline(tool: str, aw: Awaitable[Any], budget: Optional[float]) -> Any:
+    """
+    Awaits `aw` for at most `budget` seconds (no limit when None).
+
+    On expiry the caller gets DeadlineExceededError straight away, while the
+    underlying work is left running so its result still lands in the cache
+    for the next caller.
+    """
+    if budget is None:
+        return await aw
+
+    task = asyncio.ensure_future(aw)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=max(0.0, budget))
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if done:
+        return task.result()
+
+    DEADLINES_EXCEEDED.inc(tool=tool)
+    _detached.add(task)
+    task.add_done_callback(_consume_result)
+    raise DeadlineExceededError(f"{tool}: caller deadline of {budget:.2f}s exceeded")
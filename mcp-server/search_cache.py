@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(value: str) -> str:
+    """
+    Normalizes free text so trivially different spellings of the same query share a cache entry.
+
+    Args:
+        value (str): Raw text as sent by the sub-agent.
+
+    Returns:
+        str: Lower-cased text with surrounding/duplicate whitespace collapsed.
+    """
+    return _WHITESPACE.sub(" ", value.strip().lower())
+
+
+def make_cache_key(tool: str, **params: Any) -> Tuple[Hashable, ...]:
+    """
+    Builds a hashable cache key from a tool name and its call parameters.
+
+    String parameters are normalized, lists are frozen into tuples and the
+    parameters are sorted by name so keyword order never matters.
+
+    Args:
+        tool (str): Name of the MCP tool being cached.
+        **params: The (query, focus, ...) arguments the tool was called with.
+
+    Returns:
+        tuple: Key of the form (tool, (name, value), ...).
+    """
+    def _freeze(value: Any) -> Hashable:
+        if isinstance(value, str):
+            return normalize_text(value)
+        if isinstance(value, (list, tuple)):
+            return tuple(_freeze(v) for v in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+        return value
+
+    return (tool,) + tuple(sorted((name, _freeze(value)) for name, value in params.items()))
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire after a per-entry TTL.
+
+    Lookups and inserts are O(1). The least recently used entry is evicted once
+    `max_entries` is reached; expired entries are dropped lazily on access.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value for `key`, or None on a miss or an expired entry.
+        """
+        entry = self.get_with_ttl(key)
+        return None if entry is None else entry[0]
+
+    def get_with_ttl(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Like `get`, but returns (value, seconds until the entry expires).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, remaining
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores `value` under `key` for `ttl` seconds (falls back to the cache default).
+        """
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache counters in a JSON-friendly dict.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
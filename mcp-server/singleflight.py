@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into a single upstream request.
+
+    The first caller for a key (the "leader") starts the work as a task owned
+    by the flight; every caller that arrives with the same key while it is
+    still running awaits that task instead of starting its own request. A
+    cancelled caller — leader or not — only stops waiting: the request keeps
+    running for the others. Nothing is remembered once the call finishes —
+    that is the result cache's job.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `fn()` once per key at a time and shares its result (or exception).
+
+        Args:
+            key: Hashable identity of the call (e.g. a cache key).
+            fn: Zero-argument coroutine function performing the upstream call.
+
+        Returns:
+            Whatever `fn()` returns.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.leaders += 1
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # shield: a cancelled caller must not cancel the request the others are waiting for
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark retrieved so a call nobody waits for anymore doesn't log "exception never retrieved"
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running upstream."""
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the coalescing counters; `upstream_calls_saved` is the number of
+        callers that piggy-backed on another caller's request.
+        """
+        return {
+            "upstream_calls": self.leaders,
+            "upstream_calls_saved": self.shared,
+            "in_flight": self.in_flight(),
+        }
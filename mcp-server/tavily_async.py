@@ -0,0 +1,160 @@
+import asyncio
+import os
+from typing import Dict, Optional
+
+import httpx
+from tavily import AsyncTavilyClient
+from tavily.errors import UsageLimitExceededError
+
+from metrics import UPSTREAM_THROTTLED, current_tool, upstream_timer
+from rate_limit import PriorityRateLimiter
+
+
+class _SharedClientContext:
+    """
+    Async context manager that hands out an already-open httpx client and
+    leaves it open on exit, so `AsyncTavilyClient` stops building (and tearing
+    down) a fresh connection pool for every single request.
+    """
+
+    def __init__(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def __aenter__(self) -> httpx.AsyncClient:
+        return self._client
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+
+class PooledAsyncTavilyClient(AsyncTavilyClient):
+    """
+    Tavily client for the async MCP tools.
+
+    All requests share one keep-alive httpx connection pool and at most
+    `max_concurrency` of them are in flight at any time; the rest wait on a
+    semaphore without holding a thread or blocking the event loop.
+
+    With a `rate_limiter`, every request first waits for a token (interactive
+    calls ahead of background work), and a 429 from Tavily pauses the bucket
+    and re-queues the request up to `rate_limit_retries` times instead of
+    failing the tool call.
+
+    Proxies are taken from `proxies` ({"http": ..., "https": ...}) or the
+    TAVILY_HTTP_PROXY / TAVILY_HTTPS_PROXY environment variables, as in the
+    base client.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: int = 16,
+        max_connections: int = 32,
+        max_keepalive_connections: int = 16,
+        keepalive_expiry: float = 30.0,
+        api_base_url: Optional[str] = None,
+        proxies: Optional[Dict[str, str]] = None,
+        rate_limiter: Optional[PriorityRateLimiter] = None,
+        rate_limit_retries: int = 3,
+        rate_limit_cooldown: float = 2.0,
+    ):
+        super().__init__(api_key=api_key, proxies=proxies, api_base_url=api_base_url)
+        self._api_key = api_key
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Same proxy resolution as AsyncTavilyClient.__init__
+        proxies = proxies or {}
+        self._proxies = {
+            scheme: proxy
+            for scheme, proxy in (
+                ("http://", proxies.get("http", os.getenv("TAVILY_HTTP_PROXY"))),
+                ("https://", proxies.get("https", os.getenv("TAVILY_HTTPS_PROXY"))),
+            )
+            if proxy
+        }
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.rate_limit_retries = rate_limit_retries
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self._client_creator = lambda: _SharedClientContext(self._get_http_client())
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        # Built lazily so the pool is bound to the event loop that serves requests
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self._api_key}",
+                    "X-Client-Source": "tavily-python",
+                },
+                base_url=self._api_base_url,
+                limits=self._limits,
+                # Mounted transports don't inherit `limits`, so each proxy gets the pool limits too
+                mounts={
+                    scheme: httpx.AsyncHTTPTransport(proxy=proxy, limits=self._limits)
+                    for scheme, proxy in self._proxies.items()
+                } or None,
+            )
+        return self._http_client
+
+    async def _search(self, query: str, **kwargs) -> dict:
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                async with self._semaphore:
+                    async with upstream_timer():
+                        return await super()._search(query, **kwargs)
+            except UsageLimitExceededError:
+                if self.rate_limiter is None or attempt >= self.rate_limit_retries:
+                    raise
+                attempt += 1
+                UPSTREAM_THROTTLED.inc(tool=current_tool.get())
+                self.rate_limiter.pause(self.rate_limit_cooldown * attempt)
+
+    async def aclose(self) -> None:
+        """Closes the shared connection pool (call on server shutdown)."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+def create_tavily_client(api_key: str) -> PooledAsyncTavilyClient:
+    """
+    Builds the pooled async client from environment settings.
+
+    Args:
+        api_key (str): Tavily API key.
+
+    Returns:
+        PooledAsyncTavilyClient: Client sized by TAVILY_MAX_CONCURRENCY,
+        TAVILY_MAX_CONNECTIONS and TAVILY_MAX_KEEPALIVE (optionally pointed at
+        TAVILY_API_BASE_URL instead of the public API), throttled to
+        TAVILY_RATE_LIMIT_RPM requests per minute across all MCP_WORKERS.
+    """
+    rate_limiter = None
+    rpm = float(os.getenv("TAVILY_RATE_LIMIT_RPM", 100))
+    if rpm > 0:
+        # Every worker process has its own bucket, so each gets an equal share of the plan limit
+        workers = max(1, int(os.getenv("MCP_WORKERS", 1)))
+        rate_limiter = PriorityRateLimiter(
+            rate=rpm / 60 / workers,
+            burst=max(1, int(os.getenv("TAVILY_RATE_LIMIT_BURST", 10)) // workers),
+        )
+
+    return PooledAsyncTavilyClient(
+        api_key=api_key,
+        max_concurrency=int(os.getenv("TAVILY_MAX_CONCURRENCY", 16)),
+        max_connections=int(os.getenv("TAVILY_MAX_CONNECTIONS", 32)),
+        max_keepalive_connections=int(os.getenv("TAVILY_MAX_KEEPALIVE", 16)),
+        api_base_url=os.getenv("TAVILY_API_BASE_URL") or None,
+        rate_limiter=rate_limiter,
+        rate_limit_retries=int(os.getenv("TAVILY_RATE_LIMIT_RETRIES", 3)),
+        rate_limit_cooldown=float(os.getenv("TAVILY_RATE_LIMIT_COOLDOWN", 2.0)),
+    )
@@ -1,74 +1,76 @@
 #!/usr/bin/env python3
 """
-Test script for the MCP server API endpoints
+Smoke test for the MCP career search server (main_1.py).
+
+Calls every tool once over streamable HTTP. Run it against the offline
+stand-in (see fake_tavily.py) to avoid spending API credits.
 """
 
-import requests
+import asyncio
 import json
+import sys
+
+from fastmcp import Client
+
+MCP_URL = "http://localhost:8080/mcp"
 
-BASE_URL = "http://localhost:8000"
 
-def test_endpoint(endpoint_name, payload):
-    """Test a specific API endpoint"""
-    url = f"{BASE_URL}{endpoint_name}"
+async def test_tool(client, tool_name, arguments):
+    """Call a specific MCP tool and print a short summary of its output"""
+    print(f"\n=== Testing {tool_name} ===")
 
     try:
-        response = requests.post(url, json=payload, timeout=30)
-
-        print(f"\n=== Testing {endpoint_name} ===")
-        print(f"Status Code: {response.status_code}")
-
-        if response.status_code == 200:
-            result = response.json()
-            print("✅ Success!")
-            print(f"Query: {result.get('query', 'N/A')}")
-
-            answer = result.get('answer', '')
-            if answer:
-                print(f"Answer: {answer[:200]}{'...' if len(answer) > 200 else ''}")
-
-            sources = result.get('sources', [])
-            if sources:
-                print(f"Sources: {len(sources)} found")
-                for i, source in enumerate(sources[:2], 1):  # Show first 2
-                    print(f"  {i}. {source}")
-                if len(sources) > 2:
-                    print(f"  ... and {len(sources) - 2} more")
+        result = await client.call_tool(tool_name, arguments)
+        print("✅ Success!")
+
+        output = result.data
+        if isinstance(output, dict):
+            summary = str(output.get("summary", ""))
+            print(f"Summary: {summary[:200]}{'...' if len(summary) > 200 else ''}")
+
+            key_facts = output.get("key_facts", [])
+            if key_facts:
+                print(f"Key facts: {len(key_facts)} found")
+                for i, fact in enumerate(key_facts[:2], 1):  # Show first 2
+                    print(f"  {i}. {fact}")
+                if len(key_facts) > 2:
+                    print(f"  ... and {len(key_facts) - 2} more")
+            print(f"Payload size: {len(json.dumps(output))} bytes")
         else:
-            print("❌ Error:")
-            print(response.text)
+            print(f"Output: {output}")
 
-    except requests.RequestException as e:
-        print(f"❌ Request failed: {e}")
+    except Exception as e:
+        print(f"❌ Tool call failed: {e}")
 
-def main():
-    print("🧪 Testing MCP Server API")
+
+async def main(url):
+    print("🧪 Testing MCP Server tools")
     print("=" * 40)
 
-    # Test root endpoint
     try:
-        response = requests.get(f"{BASE_URL}/")
-        print("API Root Status:", response.status_code)
-        if response.status_code == 200:
-            print("Available tools:", response.json().get('tools', []))
-    except:
-        print("❌ Could not connect to API server")
-        print("Make sure to run: python mcp-server/api.py")
-        return
+        async with Client(url) as client:
+            tools = await client.list_tools()
+            print("Available tools:", [tool.name for tool in tools])
 
-    # Test each search endpoint
-    test_queries = [
-        ("/search/job_market_trends", {"query": "data science jobs in UK"}),
-        ("/search/salary_data", {"query": "software engineer salary London"}),
-        ("/search/industry_insights", {"query": "AI industry growth"}),
-        ("/search/career_paths", {"query": "from accountant to data analyst"})
-    ]
+            # Test each search tool
+            test_calls = [
+                ("search_uk_career_info", {"query": "data science graduate jobs", "focus": "trends"}),
+                ("search_uk_career_info", {"query": "software engineer salary London", "focus": "salary"}),
+                ("extract_wlv_campus_info", {"query": "printing and scanning"}),
+                ("get_uk_company_info", {"company_name": "PwC"}),
+                ("ping", {}),
+            ]
 
-    for endpoint, payload in test_queries:
-        test_endpoint(endpoint, payload)
+            for tool_name, arguments in test_calls:
+                await test_tool(client, tool_name, arguments)
+    except Exception as e:
+        print(f"❌ Could not connect to MCP server at {url}: {e}")
+        print("Make sure to run: python mcp-server/main_1.py")
+        return
 
     print("\n" + "=" * 40)
     print("Testing complete!")
 
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else MCP_URL))
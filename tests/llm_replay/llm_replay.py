@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Record/replay stand-in for the LLM providers in endpoints.yml (Gemini and
+Mistral), for benchmarking and regression-testing the bot offline.
+
+Start it, then run Rasa with endpoints.replay.yml, which points the api_base
+of every model group at it:
+
+    python tests/llm_replay/llm_replay.py --mode record            # once, with real API keys
+    python tests/llm_replay/llm_replay.py --latency recorded       # afterwards: offline, deterministic
+    rasa run --endpoints endpoints.replay.yml
+
+The first path segment of every request names its model group
+(http://localhost:8901/<model_group>/...), so each group is recorded,
+replayed and reported separately. Requests are matched on a hash of their
+body, after masking dates and times (sub-agents put the current date in
+their prompts), so a replay is byte-for-byte what was recorded.
+
+Modes:
+  record  forward every request to the real provider and save the response
+  replay  answer only from recordings; unknown requests get a 404
+  auto    replay known requests, record unknown ones
+
+Every response carries X-Replay (hit/recorded) and X-Replay-Injected-Ms
+headers, and GET /stats sums them per model group, so provider latency can
+be told apart from the pipeline's own overhead.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+import yaml
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+ROOT = Path(__file__).resolve().parents[2]
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+ENDPOINTS_FILE = ROOT / "endpoints.yml"
+
+PROVIDER_URLS = {
+    "gemini": "https://generativelanguage.googleapis.com/v1beta",
+    "mistral": "https://api.mistral.ai/v1",
+}
+
+# Headers and query parameters that carry the caller's API key upstream
+_AUTH_HEADERS = ("authorization", "x-goog-api-key")
+_AUTH_PARAMS = ("key",)
+
+# Masked before hashing, so prompts that embed "now" still match their recording
+DEFAULT_MASKS = (
+    r"\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?([+-]\d{2}:?\d{2}|Z)?)?",
+    r"\b\d{1,2}:\d{2}(:\d{2})?\s*(AM|PM|am|pm)?\b",
+    r"\b\d{1,2}(st|nd|rd|th)? (January|February|March|April|May|June|July|August|September|October|November|December),? \d{4}\b",
+    r"\b(January|February|March|April|May|June|July|August|September|October|November|December) \d{1,2}(st|nd|rd|th)?,? \d{4}\b",
+    r"\b(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b",
+)
+
+_GEMINI_METHOD = re.compile(r"(?:/models/(?P<model>[^/:]+))?:(?P<method>\w+)$")
+
+
+def load_model_groups(endpoints_file: Path = ENDPOINTS_FILE) -> Dict[str, Dict[str, Any]]:
+    """The first model of every model group in `endpoints_file`, by group id."""
+    with open(endpoints_file, encoding="utf-8") as f:
+        endpoints = yaml.safe_load(f) or {}
+    return {group["id"]: group["models"][0] for group in endpoints.get("model_groups") or [] if group.get("models")}
+
+
+def upstream_url(provider: str, model: str, path: str) -> str:
+    """
+    Real provider URL for a proxied request path. LiteLLM versions differ in
+    what they append to api_base, so only the method at the end of the path
+    (Gemini) or the OpenAI-style route (Mistral) is taken from it.
+    """
+    if provider == "gemini":
+        match = _GEMINI_METHOD.search(path)
+        if not match:
+            raise ValueError(f"not a Gemini API path: {path}")
+        return f"{PROVIDER_URLS['gemini']}/models/{match['model'] or model}:{match['method']}"
+    if provider == "mistral":
+        route = path.rsplit("/v1/", 1)[-1] if "/v1/" in path else path.rsplit("/", 1)[-1]
+        return f"{PROVIDER_URLS['mistral']}/{route}"
+    raise ValueError(f"unsupported provider: {provider}")
+
+
+def is_streaming(path: str, params: Dict[str, str], payload: Dict[str, Any]) -> bool:
+    return path.endswith(":streamGenerateContent") or params.get("alt") == "sse" or bool(payload.get("stream"))
+
+
+def _mask(value: Any, masks: List[re.Pattern]) -> Any:
+    if isinstance(value, str):
+        for mask in masks:
+            value = mask.sub("<masked>", value)
+        return value
+    if isinstance(value, list):
+        return [_mask(item, masks) for item in value]
+    if isinstance(value, dict):
+        return {key: _mask(item, masks) for key, item in value.items()}
+    return value
+
+
+def request_key(group: str, route: str, payload: Dict[str, Any], masks: List[re.Pattern]) -> str:
+    """Stable hash of a request: model group, provider route and the masked body."""
+    relevant = {"group": group, "route": route, "body": _mask(payload, masks)}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+def split_events(body: str) -> List[str]:
+    """Splits a server-sent-events body into events, keeping their separators."""
+    events = [event + "\n\n" for event in body.split("\n\n") if event.strip()]
+    return events or [body]
+
+
+class LatencyModel:
+    """
+    Delays injected in front of replayed responses:
+      none      answer immediately (pure pipeline overhead)
+      recorded  the provider's recorded time to first byte and total time, times `scale`
+      fixed     `latency_ms` (per-group overrides in `group_ms`) with lognormal `jitter`;
+                streams then send one chunk every `chunk_ms`
+    Delays are seeded by the request key, so a replay is repeatable.
+    """
+
+    def __init__(self, mode: str = "recorded", latency_ms: float = 800.0, jitter: float = 0.0,
+                 chunk_ms: float = 20.0, scale: float = 1.0, group_ms: Optional[Dict[str, float]] = None,
+                 seed: int = 0):
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.chunk_ms = chunk_ms
+        self.scale = scale
+        self.group_ms = group_ms or {}
+        self.seed = seed
+
+    def plan(self, recording: Dict[str, Any]) -> List[float]:
+        """Seconds to wait before each chunk of `recording`."""
+        chunks = len(recording["chunks"])
+        if self.mode == "none":
+            return [0.0] * chunks
+
+        if self.mode == "recorded" and recording["group"] not in self.group_ms:
+            first = recording["timing"]["first_ms"] * self.scale
+            rest = max(0.0, recording["timing"]["total_ms"] * self.scale - first)
+            per_chunk = rest / (chunks - 1) if chunks > 1 else 0.0
+            return [first / 1000] + [per_chunk / 1000] * (chunks - 1)
+
+        rng = random.Random(f"{self.seed}:{recording['key']}")
+        first = self.group_ms.get(recording["group"], self.latency_ms)
+        if self.jitter:
+            first *= rng.lognormvariate(0.0, self.jitter)
+        return [first / 1000] + [self.chunk_ms / 1000] * (chunks - 1)
+
+
+class LLMReplay:
+    """Records provider responses to `recordings_dir` and replays them with injected latency."""
+
+    def __init__(
+        self,
+        mode: str = "auto",
+        latency: Optional[LatencyModel] = None,
+        recordings_dir: Path = RECORDINGS_DIR,
+        endpoints_file: Path = ENDPOINTS_FILE,
+        masks: Tuple[str, ...] = DEFAULT_MASKS,
+    ):
+        self.mode = mode
+        self.latency = latency or LatencyModel()
+        self.recordings_dir = recordings_dir
+        self.groups = load_model_groups(endpoints_file)
+        self.masks = [re.compile(mask) for mask in masks]
+        self.client: Optional[httpx.AsyncClient] = None
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _count(self, group: str, field: str, amount: float = 1) -> None:
+        counters = self.stats.setdefault(group, {"requests": 0, "hits": 0, "recorded": 0, "misses": 0,
+                                                 "upstream_errors": 0, "injected_ms": 0.0})
+        counters[field] += amount
+
+    def _path(self, group: str, key: str) -> Path:
+        return self.recordings_dir / group / f"{key}.json"
+
+    def _load(self, group: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(group, key)
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, recording: Dict[str, Any]) -> None:
+        path = self._path(recording["group"], recording["key"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(recording, f, indent=2, ensure_ascii=False)
+
+    async def handle(self, group: str, path: str, request: Request) -> Response:
+        self._count(group, "requests")
+        model = self.groups.get(group)
+        if model is None:
+            return JSONResponse(status_code=404, content={"error": {"message": f"unknown model group '{group}'"}})
+
+        payload = await request.json()
+        params = dict(request.query_params)
+        stream = is_streaming(path, params, payload)
+        try:
+            route = upstream_url(model["provider"], model["model"], path).rsplit("/", 1)[-1]
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": {"message": str(e)}})
+        key = request_key(group, route, payload, self.masks)
+
+        recording = None if self.mode == "record" else self._load(group, key)
+        if recording is not None:
+            self._count(group, "hits")
+            return self._replay(recording, "hit")
+
+        if self.mode == "replay":
+            self._count(group, "misses")
+            return JSONResponse(
+                status_code=404,
+                content={"error": {"message": f"no recording for {group} request {key}; re-run with --mode auto"}},
+            )
+
+        try:
+            recording, error = await self._record(group, key, model, path, params, payload, stream, request)
+        except httpx.HTTPError as e:
+            recording, error = None, JSONResponse(status_code=502, content={"error": {"message": f"provider unreachable: {e}"}})
+        if error is not None:
+            self._count(group, "upstream_errors")
+            return error
+        self._count(group, "recorded")
+        # The live call already took provider time; replay it without injected delay
+        return self._replay(recording, "recorded", inject=False)
+
+    async def _record(self, group: str, key: str, model: Dict[str, Any], path: str, params: Dict[str, str],
+                      payload: Dict[str, Any], stream: bool, request: Request) -> Tuple[Optional[Dict[str, Any]], Optional[Response]]:
+        headers = {name: request.headers[name] for name in _AUTH_HEADERS if name in request.headers}
+        upstream_params = {name: value for name, value in params.items() if name in _AUTH_PARAMS or name == "alt"}
+        url = upstream_url(model["provider"], model["model"], path)
+
+        started = time.monotonic()
+        first_ms = None
+        body = b""
+        async with self.client.stream("POST", url, json=payload, headers=headers, params=upstream_params) as upstream:
+            async for chunk in upstream.aiter_bytes():
+                if first_ms is None:
+                    first_ms = (time.monotonic() - started) * 1000
+                body += chunk
+            status, content_type = upstream.status_code, upstream.headers.get("content-type", "application/json")
+        total_ms = (time.monotonic() - started) * 1000
+
+        if status >= 400:
+            # Never record failures: they would be replayed forever
+            return None, Response(content=body, status_code=status, media_type=content_type)
+
+        text = body.decode("utf-8")
+        recording = {
+            "key": key,
+            "group": group,
+            "provider": model["provider"],
+            "model": model["model"],
+            "route": url.rsplit("/", 1)[-1],
+            "stream": stream,
+            "request": payload,
+            "status": status,
+            "content_type": content_type,
+            "chunks": split_events(text) if stream else [text],
+            "timing": {"first_ms": round(first_ms or total_ms, 1), "total_ms": round(total_ms, 1)},
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        self._save(recording)
+        return recording, None
+
+    def _replay(self, recording: Dict[str, Any], outcome: str, inject: bool = True) -> Response:
+        delays = self.latency.plan(recording) if inject else [0.0] * len(recording["chunks"])
+        injected_ms = round(sum(delays) * 1000, 1)
+        self._count(recording["group"], "injected_ms", injected_ms)
+        headers = {"X-Replay": outcome, "X-Replay-Injected-Ms": str(injected_ms)}
+
+        if not recording["stream"]:
+            async def _delayed() -> AsyncIterator[str]:
+                await asyncio.sleep(delays[0])
+                yield recording["chunks"][0]
+            return StreamingResponse(_delayed(), status_code=recording["status"],
+                                     media_type=recording["content_type"], headers=headers)
+
+        async def _chunks() -> AsyncIterator[str]:
+            for delay, chunk in zip(delays, recording["chunks"]):
+                await asyncio.sleep(delay)
+                yield chunk
+        return StreamingResponse(_chunks(), status_code=recording["status"],
+                                 media_type=recording["content_type"], headers=headers)
+
+
+def create_app(replay: LLMReplay) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        replay.client = httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=10.0))
+        try:
+            yield
+        finally:
+            await replay.client.aclose()
+
+    app = FastAPI(title="LLM record/replay", lifespan=lifespan)
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return {"mode": replay.mode, "latency": replay.latency.mode, "groups": replay.stats}
+
+    @app.post("/{group}/{path:path}")
+    async def proxy(group: str, path: str, request: Request) -> Response:
+        return await replay.handle(group, "/" + path, request)
+
+    return app
+
+
+def _group_latency(value: str) -> Tuple[str, float]:
+    group, _, ms = value.partition("=")
+    return group, float(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay stand-in for the LLM providers in endpoints.yml")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--mode", choices=["record", "replay", "auto"], default="auto")
+    parser.add_argument("--latency", choices=["none", "recorded", "fixed"], default="recorded",
+                        help="Delay injected in front of replayed responses")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Time to first byte for --latency fixed")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Lognormal sigma applied to --latency-ms")
+    parser.add_argument("--chunk-ms", type=float, default=20.0, help="Gap between streamed chunks for --latency fixed")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for --latency recorded")
+    parser.add_argument("--group-latency", type=_group_latency, action="append", default=[], metavar="GROUP=MS",
+                        help="Fixed time to first byte for one model group (repeatable)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the injected jitter")
+    parser.add_argument("--recordings", type=Path, default=RECORDINGS_DIR)
+    parser.add_argument("--endpoints", type=Path, default=ENDPOINTS_FILE, help="Where the model groups are defined")
+    parser.add_argument("--mask", action="append", default=[], help="Extra regex masked before matching (repeatable)")
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.latency, args.latency_ms, args.jitter, args.chunk_ms, args.scale,
+                           dict(args.group_latency), args.seed)
+    replay = LLMReplay(args.mode, latency, args.recordings, args.endpoints, DEFAULT_MASKS + tuple(args.mask))
+    uvicorn.run(create_app(replay), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
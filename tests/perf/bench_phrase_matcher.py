@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the slot validators' phrase matching.
+
+Compares the compiled PhraseMatcher (actions/general/phrase_matcher.py)
+with the per-call `any(phrase in answer.lower() ...)` scan it replaced, as
+the vocabularies grow from the shipped slot_vocabularies.yml to thousands of
+phrases in several languages.
+
+With the shipped vocabularies (~85 phrases) a validation costs about 4 µs,
+slightly more than scanning the same phrases (~3.5 µs) and about twice the
+old 5-phrase scans of each validator; it breaks even at ~150 phrases and
+stays flat beyond, while the scan grows linearly.
+
+    python tests/perf/bench_phrase_matcher.py
+    python tests/perf/bench_phrase_matcher.py --sizes 100 1000 5000 --json bench_phrase_matcher.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+# Import the module directly: the actions package pulls in rasa_sdk on import
+sys.path.insert(0, str(ROOT / "actions" / "general"))
+
+from phrase_matcher import PhraseMatcher, load_vocabularies  # noqa: E402
+
+# Answers students type into the career advice form, matching and not matching
+ANSWERS = [
+    "skip", "Sam", "I'd rather not say", "Computer Science", "second year", "don't know",
+    "3.7", "prefer not to say", "yes, one last summer at a bank", "no thanks",
+    "I'm an international student on a student visa", "not relevant for me",
+    "Je préfère ne pas répondre", "no sé", "Passmore", "It's private",
+    "I am in my final year studying mechanical engineering and I'm not sure about my GPA",
+]
+
+_SYLLABLES = ["pre", "fer", "not", "skip", "pas", "ser", "nein", "da", "ke", "mer", "ci", "sí", "bien", "über",
+              "sprin", "gen", "ra", "ther", "nah", "nie", "mal", "ja", "oui", "na", "po", "zh", "al", "ré"]
+
+
+def synthetic_vocabularies(size: int, seed: int = 0) -> Dict[str, List[str]]:
+    """The shipped vocabularies topped up with `size` made-up multi-word phrases."""
+    rng = random.Random(seed)
+    vocabularies = load_vocabularies(ROOT / "actions" / "general" / "slot_vocabularies.yml")
+    categories = list(vocabularies)
+    for _ in range(size):
+        words = ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 4))]
+        vocabularies[rng.choice(categories)].append(" ".join(words))
+    return vocabularies
+
+
+def _naive_matches(answer: str, phrases: List[str]) -> bool:
+    # What each validator did before: lower-case, then scan every phrase
+    lowered = answer.lower()
+    return any(phrase in lowered for phrase in phrases)
+
+
+def _per_call_us(fn, answers: List[str], min_seconds: float) -> float:
+    calls, started = 0, time.perf_counter()
+    while True:
+        for answer in answers:
+            fn(answer)
+        calls += len(answers)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1e6
+
+
+def bench(size: int, min_seconds: float, seed: int) -> Dict[str, Any]:
+    vocabularies = synthetic_vocabularies(size, seed)
+    # What validate_year_of_study declines (skip + not_specified)
+    skip_phrases = vocabularies["skip"] + vocabularies["not_specified"]
+
+    started = time.perf_counter()
+    matcher = PhraseMatcher(vocabularies)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    naive_us = _per_call_us(lambda a: _naive_matches(a, skip_phrases), ANSWERS, min_seconds)
+    matcher_us = _per_call_us(lambda a: matcher.matches(a, "skip", "not_specified"), ANSWERS, min_seconds)
+    all_us = _per_call_us(matcher.categories, ANSWERS, min_seconds)
+    return {
+        "phrases": len(matcher),
+        "build_ms": round(build_ms, 2),
+        "naive_us": round(naive_us, 2),
+        "matcher_us": round(matcher_us, 2),
+        "all_categories_us": round(all_us, 2),
+        "speedup": round(naive_us / matcher_us, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phrase matching cost per slot validation")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[0, 100, 500, 2000, 10000],
+                        help="Synthetic phrases added to the shipped vocabularies")
+    parser.add_argument("--min-seconds", type=float, default=0.3, help="Time spent measuring each variant")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    rows = [bench(size, args.min_seconds, args.seed) for size in args.sizes]
+    print(f"{'phrases':>8} {'build ms':>9} {'naive µs':>9} {'matcher µs':>11} {'all cats µs':>12} {'speedup':>8}")
+    for row in rows:
+        print(f"{row['phrases']:>8} {row['build_ms']:>9} {row['naive_us']:>9} {row['matcher_us']:>11} "
+              f"{row['all_categories_us']:>12} {row['speedup']:>7}x")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Conversation load generator for the Rasa REST webhook.
+
+Replays the conversations of tests/e2e_test_cases.yml and the synthetic
+sessions of tests/perf/flow_scenarios.yml (built on the flows in data/) as
+concurrent student sessions, then reports per-turn latency percentiles by
+flow:
+
+    # Against a running bot (or the gateway in front of it)
+    python tests/perf/load_test.py --endpoint http://localhost:5005/webhooks/rest/webhook \\
+        --sessions 200 --rate 2 --max-active 50
+
+    # Dry run against an in-process stub, to check the scenarios and the harness
+    python tests/perf/load_test.py --stub --sessions 500 --rate 50
+
+Sessions arrive as a Poisson process at `--rate` per second; every session
+sends its turns one after another, pausing `--think-time` seconds (randomized)
+between them like a student reading the reply.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import yaml
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_E2E_FILE = ROOT / "tests" / "e2e_test_cases.yml"
+DEFAULT_SCENARIOS_FILE = Path(__file__).resolve().parent / "flow_scenarios.yml"
+DEFAULT_DATA_DIR = ROOT / "data"
+DEFAULT_ENDPOINT = "http://localhost:5005/webhooks/rest/webhook"
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class Session:
+    """A scripted conversation: `turns` are sent in order by one sender."""
+    name: str
+    flow: str
+    source: str
+    turns: List[str]
+
+
+@dataclass
+class TurnResult:
+    flow: str
+    session: str
+    turn: int
+    status: str  # ok | empty | shed | http_error | error
+    latency: float
+    started: float
+
+
+# ──────────────────────────────────────────────────────────────
+# Session sources
+# ──────────────────────────────────────────────────────────────
+
+def load_e2e_sessions(path: Path = DEFAULT_E2E_FILE) -> List[Session]:
+    """
+    One session per e2e test case. Its flow is the first flow the test case
+    expects to start (the test case name if it asserts none).
+    """
+    with open(path, encoding="utf-8") as f:
+        cases = (yaml.safe_load(f) or {}).get("test_cases") or []
+
+    sessions = []
+    for case in cases:
+        turns = [step["user"] for step in case.get("steps", []) if "user" in step]
+        if not turns:
+            continue
+        flow = case["test_case"]
+        for step in case["steps"]:
+            started = next((a["flow_started"] for a in step.get("assertions") or [] if "flow_started" in a), None)
+            if started and started.get("flow_ids"):
+                flow = started["flow_ids"][0]
+                break
+        sessions.append(Session(case["test_case"], flow, "e2e", turns))
+    return sessions
+
+
+def load_flows(data_dir: Path = DEFAULT_DATA_DIR) -> Dict[str, Dict[str, Any]]:
+    """Every flow defined under `data_dir`, by flow id."""
+    flows: Dict[str, Dict[str, Any]] = {}
+    for path in sorted(data_dir.rglob("*.yml")):
+        with open(path, encoding="utf-8") as f:
+            flows.update((yaml.safe_load(f) or {}).get("flows") or {})
+    return flows
+
+
+def collected_slots(flow_id: str, flows: Dict[str, Dict[str, Any]], _seen: Optional[set] = None) -> List[str]:
+    """
+    Slots a flow collects, in step order, including flows it `call`s (those
+    return to the caller; `link`ed flows don't and are left out).
+    """
+    seen = _seen if _seen is not None else set()
+    if flow_id in seen or flow_id not in flows:
+        return []
+    seen.add(flow_id)
+    slots: List[str] = []
+    for step in flows[flow_id].get("steps") or []:
+        if "collect" in step and step["collect"] not in slots:
+            slots.append(step["collect"])
+        elif "call" in step:
+            slots += [s for s in collected_slots(step["call"], flows, seen) if s not in slots]
+    return slots
+
+
+def load_flow_sessions(
+    scenarios_path: Path = DEFAULT_SCENARIOS_FILE,
+    data_dir: Path = DEFAULT_DATA_DIR,
+    rng: Optional[random.Random] = None,
+) -> List[Session]:
+    """
+    One session per scenario opener, answering the flow's collect steps with
+    answers picked at random from the scenario file.
+
+    Raises:
+        ValueError: A scenario names a flow that does not exist in `data_dir`.
+    """
+    rng = rng or random.Random()
+    flows = load_flows(data_dir)
+    with open(scenarios_path, encoding="utf-8") as f:
+        scenarios = (yaml.safe_load(f) or {}).get("flows") or {}
+
+    unknown = sorted(set(scenarios) - set(flows))
+    if unknown:
+        raise ValueError(f"{scenarios_path.name} names flows missing from {data_dir}: {unknown}")
+
+    sessions = []
+    for flow_id, scenario in scenarios.items():
+        answers = scenario.get("answers") or {}
+        for i, opener in enumerate(scenario.get("openers") or []):
+            turns = [opener]
+            for slot in collected_slots(flow_id, flows):
+                if slot in answers:
+                    options = answers[slot]
+                    turns.append(str(rng.choice(options) if isinstance(options, list) else options))
+            sessions.append(Session(f"{flow_id}#{i + 1}", flow_id, "flows", turns))
+    return sessions
+
+
+# ──────────────────────────────────────────────────────────────
+# Stub bot
+# ──────────────────────────────────────────────────────────────
+
+def stub_transport(median_ms: float = 800, sigma: float = 0.6, error_rate: float = 0.0,
+                   rng: Optional[random.Random] = None) -> httpx.MockTransport:
+    """
+    An in-process stand-in for the webhook: lognormal latency around
+    `median_ms`, a 500 for `error_rate` of the turns, otherwise one bot message.
+    """
+    rng = rng or random.Random()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(rng.lognormvariate(math.log(median_ms / 1000), sigma))
+        if rng.random() < error_rate:
+            return httpx.Response(500, json={"error": "stub failure"})
+        payload = json.loads(request.content)
+        return httpx.Response(200, json=[{"recipient_id": payload["sender"], "text": f"stub reply to: {payload['message']}"}])
+
+    return httpx.MockTransport(handler)
+
+
+# ──────────────────────────────────────────────────────────────
+# Load run
+# ──────────────────────────────────────────────────────────────
+
+async def _send_turn(client: httpx.AsyncClient, endpoint: str, sender: str, text: str) -> str:
+    response = await client.post(endpoint, json={"sender": sender, "message": text})
+    if response.headers.get("X-Gateway-Shed"):
+        return "shed"
+    if response.status_code >= 400:
+        return "http_error"
+    return "ok" if response.json() else "empty"
+
+
+async def run_load(
+    sessions: List[Session],
+    endpoint: str = DEFAULT_ENDPOINT,
+    total_sessions: int = 100,
+    rate: float = 1.0,
+    max_active: int = 50,
+    think_time: float = 3.0,
+    timeout: float = 120.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    rng: Optional[random.Random] = None,
+) -> List[TurnResult]:
+    """
+    Starts `total_sessions` sessions (drawn at random from `sessions`) at a
+    Poisson arrival `rate` per second (0: all at once), never more than
+    `max_active` at a time, and records every turn.
+    """
+    rng = rng or random.Random()
+    run_id = uuid.uuid4().hex[:8]
+    results: List[TurnResult] = []
+    active = asyncio.Semaphore(max_active)
+    t0 = time.monotonic()
+
+    async def _session(n: int, session: Session, client: httpx.AsyncClient) -> None:
+        # A unique sender per session, so trackers never mix across sessions or runs
+        sender = f"load-{run_id}-{n}"
+        async with active:
+            for turn, text in enumerate(session.turns, start=1):
+                if turn > 1 and think_time > 0:
+                    await asyncio.sleep(rng.uniform(0.5, 1.5) * think_time)
+                started = time.monotonic()
+                try:
+                    status = await _send_turn(client, endpoint, sender, text)
+                except httpx.HTTPError:
+                    status = "error"
+                results.append(TurnResult(session.flow, session.name, turn, status,
+                                          time.monotonic() - started, started - t0))
+                if status not in ("ok", "empty"):
+                    break  # the rest of the script no longer matches the bot's state
+
+    limits = httpx.Limits(max_connections=max_active, max_keepalive_connections=max_active)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport) as client:
+        tasks = []
+        for n in range(total_sessions):
+            tasks.append(asyncio.create_task(_session(n, rng.choice(sessions), client)))
+            if rate > 0 and n < total_sessions - 1:
+                await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+    return results
+
+
+# ──────────────────────────────────────────────────────────────
+# Report
+# ──────────────────────────────────────────────────────────────
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(results: List[TurnResult]) -> Dict[str, Any]:
+    """Latency percentiles (ms, successful turns only) and outcome counts, per flow and overall."""
+    groups: Dict[str, List[TurnResult]] = defaultdict(list)
+    for result in results:
+        groups[result.flow].append(result)
+        groups["ALL"].append(result)
+
+    duration = max((r.started + r.latency for r in results), default=0.0)
+    summary: Dict[str, Any] = {"duration_s": round(duration, 1), "flows": {}}
+    for flow, rows in sorted(groups.items(), key=lambda item: (item[0] == "ALL", item[0])):
+        latencies = sorted(r.latency * 1000 for r in rows if r.status in ("ok", "empty"))
+        statuses: Dict[str, int] = defaultdict(int)
+        for r in rows:
+            statuses[r.status] += 1
+        summary["flows"][flow] = {
+            "turns": len(rows),
+            "sessions": len({r.session for r in rows if r.turn == 1}),
+            **dict(statuses),
+            **{f"p{p}": round(percentile(latencies, p)) for p in PERCENTILES if latencies},
+            "max": round(latencies[-1]) if latencies else None,
+        }
+    summary["turns_per_s"] = round(len(results) / duration, 2) if duration else 0.0
+    return summary
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    columns = ["turns", "ok", "empty", "shed", "http_error", "error", *(f"p{p}" for p in PERCENTILES), "max"]
+    width = max([len("flow"), *(len(flow) for flow in summary["flows"])])
+    print(f"{'flow':<{width}}  " + "  ".join(f"{c:>10}" for c in columns))
+    for flow, row in summary["flows"].items():
+        cells = [row.get(c, 0) if not c.startswith("p") and c != "max" else row.get(c, "-") for c in columns]
+        print(f"{flow:<{width}}  " + "  ".join(f"{str(c):>10}" for c in cells))
+    print(f"\nLatencies in ms (ok/empty turns only). {summary['turns_per_s']} turns/s over {summary['duration_s']}s.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay e2e test cases and flow scenarios as concurrent student sessions")
+    parser.add_argument("--endpoint", default=DEFAULT_ENDPOINT, help="Rasa REST webhook (or gateway) URL")
+    parser.add_argument("--stub", action="store_true", help="Use an in-process stub bot instead of --endpoint")
+    parser.add_argument("--stub-latency-ms", type=float, default=800, help="Median stub latency")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Share of stub turns that fail")
+    parser.add_argument("--sessions", type=int, default=100, help="Sessions to run")
+    parser.add_argument("--rate", type=float, default=1.0, help="New sessions per second (0: all at once)")
+    parser.add_argument("--max-active", type=int, default=50, help="Sessions running at the same time")
+    parser.add_argument("--think-time", type=float, default=3.0, help="Mean seconds between a reply and the next turn")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for one reply")
+    parser.add_argument("--source", choices=["all", "e2e", "flows"], default="all", help="Which sessions to replay")
+    parser.add_argument("--flow", action="append", help="Only replay sessions of this flow (repeatable)")
+    parser.add_argument("--e2e-file", type=Path, default=DEFAULT_E2E_FILE)
+    parser.add_argument("--scenarios", type=Path, default=DEFAULT_SCENARIOS_FILE)
+    parser.add_argument("--seed", type=int, help="Make session choice, arrivals and answers repeatable")
+    parser.add_argument("--json", type=Path, help="Also write the summary and every turn to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions: List[Session] = []
+    if args.source in ("all", "e2e"):
+        sessions += load_e2e_sessions(args.e2e_file)
+    if args.source in ("all", "flows"):
+        sessions += load_flow_sessions(args.scenarios, rng=rng)
+    if args.flow:
+        sessions = [s for s in sessions if s.flow in args.flow]
+    if not sessions:
+        parser.error("no sessions to replay")
+
+    transport = stub_transport(args.stub_latency_ms, error_rate=args.stub_error_rate, rng=rng) if args.stub else None
+    target = "stub" if args.stub else args.endpoint
+    print(f"Replaying {args.sessions} sessions ({len(sessions)} scripts) against {target} "
+          f"at {args.rate}/s, max {args.max_active} active")
+
+    results = asyncio.run(run_load(
+        sessions, args.endpoint, args.sessions, args.rate, args.max_active,
+        args.think_time, args.timeout, transport, rng,
+    ))
+    summary = summarize(results)
+    print_report(summary)
+    if args.json:
+        args.json.write_text(json.dumps({"summary": summary, "turns": [asdict(r) for r in results]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
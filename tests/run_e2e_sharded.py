@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Runs tests/e2e_test_cases.yml in parallel shards against memoized LLM and
+MCP responses, then merges the shards' coverage reports.
+
+    python tests/run_e2e_sharded.py --shards 4
+    python tests/run_e2e_sharded.py --shards 8 -k career --replay-mode replay   # offline, misses fail
+
+What makes it fast:
+  - test cases are split into shards (balanced by number of turns), each run
+    by its own `rasa test e2e` process
+  - every LLM and embedding call goes through the record/replay proxy
+    (tests/llm_replay/llm_replay.py, via endpoints.replay.yml) with no
+    injected latency; the first run records, later runs replay by prompt hash
+  - with --start-mcp, one MCP server is shared by all shards and keeps tool
+    results in an SQLite cache (tests/.e2e_cache/mcp_cache.db) across runs
+
+The merged report in --output has the same files as a serial run: a step
+counts as covered if any shard covered it. Rasa only writes the command
+histograms as images, so those are copied per shard.
+"""
+
+import argparse
+import csv
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_TESTS = ROOT / "tests" / "e2e_test_cases.yml"
+DEFAULT_OUTPUT = ROOT / "coverage_reports"
+CACHE_DIR = ROOT / "tests" / ".e2e_cache"
+REPLAY_SCRIPT = ROOT / "tests" / "llm_replay" / "llm_replay.py"
+REPLAY_ENDPOINTS = ROOT / "endpoints.replay.yml"
+REPLAY_URL = "http://127.0.0.1:8901"
+MCP_URL = "http://127.0.0.1:8080"
+
+COVERAGE_FILES = ("coverage_report_for_passed_tests.csv", "coverage_report_for_failed_tests.csv")
+RESULT_FILES = ("passed.yml", "failed.yml")
+_RANGE = re.compile(r"\d+-\d+")
+# Rasa appends a summary row with this flow name to every coverage report
+_TOTAL_ROW = "Total"
+
+
+# ──────────────────────────────────────────────────────────────
+# Sharding
+# ──────────────────────────────────────────────────────────────
+
+def load_suite(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def shard_cases(cases: List[Dict[str, Any]], shards: int) -> List[List[Dict[str, Any]]]:
+    """
+    Splits test cases into at most `shards` groups with similar total turns
+    (longest case first, each to the currently lightest shard).
+    """
+    buckets: List[Tuple[int, int, List[Dict[str, Any]]]] = [(0, i, []) for i in range(max(1, min(shards, len(cases))))]
+    for case in sorted(cases, key=lambda c: len(c.get("steps") or []), reverse=True):
+        weight, index, bucket = min(buckets)
+        bucket.append(case)
+        buckets[index] = (weight + len(case.get("steps") or []), index, bucket)
+    return [bucket for _, _, bucket in buckets if bucket]
+
+
+def write_shard(suite: Dict[str, Any], cases: List[Dict[str, Any]], directory: Path) -> Path:
+    """Writes one shard as a test suite (keeping the suite's fixtures, metadata and stubs)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    shard = {key: value for key, value in suite.items() if key != "test_cases"}
+    shard["test_cases"] = cases
+    path = directory / "test_cases.yml"
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(shard, f, sort_keys=False, allow_unicode=True)
+    return path
+
+
+# ──────────────────────────────────────────────────────────────
+# Shared services
+# ──────────────────────────────────────────────────────────────
+
+def _ensure_port_free(url: str) -> None:
+    """
+    Fails if something already listens on the host and port of `url`: the
+    endpoints files point the shards at fixed ports, and a stray server there
+    would be tested instead of the isolated one started here.
+    """
+    address = urllib.parse.urlsplit(url)
+    try:
+        socket.create_connection((address.hostname, address.port), timeout=1).close()
+    except OSError:
+        return
+    raise RuntimeError(f"{address.hostname}:{address.port} is already in use; stop whatever listens there "
+                       f"(e.g. a dev server started by hand) before running the sharded suite")
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    """Waits until something listens on the host and port of `url`."""
+    address = urllib.parse.urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with code {process.returncode}")
+        try:
+            socket.create_connection((address.hostname, address.port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_replay_proxy(mode: str, log_dir: Path) -> subprocess.Popen:
+    _ensure_port_free(REPLAY_URL)
+    log = open(log_dir / "llm_replay.log", "w", encoding="utf-8")
+    process = subprocess.Popen(
+        [sys.executable, str(REPLAY_SCRIPT), "--mode", mode, "--latency", "none"],
+        cwd=ROOT, stdout=log, stderr=subprocess.STDOUT,
+    )
+    _wait_until_up(REPLAY_URL, process)
+    return process
+
+
+def start_mcp_server(python: str, log_dir: Path) -> subprocess.Popen:
+    _ensure_port_free(MCP_URL)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env = {
+        **os.environ,
+        "MCP_CACHE_DB": str(CACHE_DIR / "mcp_cache.db"),
+        # Tool results are test fixtures here: keep them for a month, never refresh them early
+        "CAREER_CACHE_TTL": os.getenv("CAREER_CACHE_TTL", str(30 * 24 * 3600)),
+        "CAMPUS_CACHE_TTL": os.getenv("CAMPUS_CACHE_TTL", str(30 * 24 * 3600)),
+        "COMPANY_CACHE_TTL": os.getenv("COMPANY_CACHE_TTL", str(30 * 24 * 3600)),
+        "WARM_ENABLED": "false",
+    }
+    log = open(log_dir / "mcp_server.log", "w", encoding="utf-8")
+    process = subprocess.Popen(
+        [python, "main_1.py"], cwd=ROOT / "mcp-server", env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    _wait_until_up(MCP_URL, process)
+    return process
+
+
+def run_shards(shard_files: List[Path], endpoints: Path, extra_args: List[str]) -> List[Dict[str, Any]]:
+    """Runs every shard as its own `rasa test e2e` process, all at once."""
+    running = []
+    for path in shard_files:
+        out_dir = path.parent / "coverage"
+        log = open(path.parent / "rasa.log", "w", encoding="utf-8")
+        command = [
+            "rasa", "test", "e2e", str(path),
+            "--endpoints", str(endpoints),
+            "--coverage-report", "--coverage-output-path", str(out_dir),
+            *extra_args,
+        ]
+        running.append((path, out_dir, log, time.monotonic(), subprocess.Popen(command, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)))
+
+    results = []
+    for path, out_dir, log, started, process in running:
+        code = process.wait()
+        log.close()
+        results.append({
+            "shard": path.parent.name,
+            "exit_code": code,
+            "seconds": round(time.monotonic() - started, 1),
+            "coverage_dir": out_dir,
+            "log": path.parent / "rasa.log",
+        })
+    return results
+
+
+# ──────────────────────────────────────────────────────────────
+# Merging
+# ──────────────────────────────────────────────────────────────
+
+def merge_coverage(csv_paths: List[Path], output: Path) -> None:
+    """
+    Merges per-shard coverage CSVs: a flow step is missing only if it is
+    missing in every shard that reports the flow. The shards' "Total" rows
+    are dropped and the total is recomputed from the merged flows.
+    """
+    flows: Dict[str, Dict[str, Any]] = {}
+    header: Optional[List[str]] = None
+    for path in csv_paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or header
+            for name, _coverage, num_steps, _missing, lines in reader:
+                if name == _TOTAL_ROW:
+                    continue
+                missing: Set[str] = set(_RANGE.findall(lines))
+                flow = flows.setdefault(name, {"steps": int(num_steps), "missing": missing})
+                flow["steps"] = max(flow["steps"], int(num_steps))
+                flow["missing"] &= missing
+
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header or ["Flow Name", "Coverage", "Num Steps", "Missing Steps", "Line Numbers for Missing Steps"])
+        total_steps = total_missing = 0
+        for name, flow in flows.items():
+            missing = sorted(flow["missing"], key=lambda r: tuple(int(n) for n in r.split("-")))
+            # Same format as Rasa: raw percentages for flows, two decimals and "%" for the total only
+            coverage = 100.0 * (flow["steps"] - len(missing)) / flow["steps"] if flow["steps"] else 0.0
+            writer.writerow([name, coverage, flow["steps"], len(missing), f"[{', '.join(missing)}]"])
+            total_steps += flow["steps"]
+            total_missing += len(missing)
+        total = 100.0 * (total_steps - total_missing) / total_steps if total_steps else 0.0
+        writer.writerow([_TOTAL_ROW, f"{total:.2f}%", total_steps, total_missing, ""])
+
+
+def merge_results(yml_paths: List[Path], output: Path) -> None:
+    """Concatenates the test cases of per-shard result files."""
+    merged: Dict[str, Any] = {}
+    for path in yml_paths:
+        with open(path, encoding="utf-8") as f:
+            shard = yaml.safe_load(f) or {}
+        for key, value in shard.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            else:
+                merged.setdefault(key, value)
+    with open(output, "w", encoding="utf-8") as f:
+        yaml.safe_dump(merged, f, sort_keys=False, allow_unicode=True)
+
+
+def merge_reports(results: List[Dict[str, Any]], output: Path) -> None:
+    output.mkdir(parents=True, exist_ok=True)
+    for name in COVERAGE_FILES:
+        paths = [r["coverage_dir"] / name for r in results if (r["coverage_dir"] / name).exists()]
+        if paths:
+            merge_coverage(paths, output / name)
+    for name in RESULT_FILES:
+        paths = [r["coverage_dir"] / name for r in results if (r["coverage_dir"] / name).exists()]
+        if paths:
+            merge_results(paths, output / name)
+    for r in results:
+        for image in sorted(r["coverage_dir"].glob("*.png")):
+            shutil.copy(image, output / f"{image.stem}_{r['shard']}{image.suffix}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the e2e test suite in parallel shards with memoized LLM/MCP responses")
+    parser.add_argument("tests", nargs="?", type=Path, default=DEFAULT_TESTS, help="E2E test suite file")
+    parser.add_argument("--shards", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("-k", dest="filter", help="Only run test cases whose name contains this text")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where the merged coverage report goes")
+    parser.add_argument("--replay-mode", choices=["auto", "replay", "record"], default="auto",
+                        help="LLM proxy mode (auto: record cache misses with the real API keys)")
+    parser.add_argument("--live-llm", action="store_true", help="Call the providers directly (endpoints.yml), no proxy")
+    parser.add_argument("--start-mcp", action="store_true", help="Start a shared MCP server with a persistent cache")
+    parser.add_argument("--mcp-python", default=sys.executable, help="Python of the MCP server environment")
+    parser.add_argument("--keep", action="store_true", help="Keep the per-shard directories")
+    # Anything else (e.g. --fail-fast) is passed on to `rasa test e2e`
+    args, rasa_args = parser.parse_known_args()
+
+    suite = load_suite(args.tests)
+    cases = [c for c in suite.get("test_cases") or [] if not args.filter or args.filter in c["test_case"]]
+    if not cases:
+        parser.error("no test cases selected")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="e2e_shards_"))
+    shard_files = [write_shard(suite, shard, work_dir / f"shard_{i}") for i, shard in enumerate(shard_cases(cases, args.shards))]
+    print(f"{len(cases)} test cases in {len(shard_files)} shards ({work_dir})")
+
+    services: List[subprocess.Popen] = []
+    try:
+        if not args.live_llm:
+            services.append(start_replay_proxy(args.replay_mode, work_dir))
+        if args.start_mcp:
+            services.append(start_mcp_server(args.mcp_python, work_dir))
+
+        started = time.monotonic()
+        results = run_shards(shard_files, ROOT / "endpoints.yml" if args.live_llm else REPLAY_ENDPOINTS, rasa_args)
+        elapsed = time.monotonic() - started
+    finally:
+        for process in services:
+            process.terminate()
+            process.wait(timeout=10)
+
+    merge_reports(results, args.output)
+    for r in results:
+        status = "ok" if r["exit_code"] == 0 else f"FAILED (exit {r['exit_code']}, see {r['log']})"
+        print(f"  {r['shard']}: {r['seconds']}s {status}")
+    print(f"All shards done in {elapsed:.1f}s; merged coverage report in {args.output}")
+
+    if not args.keep and all(r["exit_code"] == 0 for r in results):
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0 if all(r["exit_code"] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())